@@ -0,0 +1,5 @@
+# Tests sit next to the modules they cover and import them from this
+# directory (vision.*, voice.*), the same way the servers do.
+
+# A manual script that calls the OpenAI API, not a pytest module
+collect_ignore = ["judges/test_judges.py"]
@@ -4,33 +4,47 @@ import aiohttp
 import base64
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, BackgroundTasks
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-from deepface import DeepFace
-from typing import Dict, Any
-from collections import defaultdict
+from typing import Dict, Any, Optional
 import json
 import asyncio
 import os
 
-import pyaudio
-from pydub import AudioSegment
-from elevenlabs import ElevenLabs, play
 
 # ========== Import from chatbot pieces ==========
 from judges.evaluation import EnhancedEvaluator
 from voice.chatbot import (
     decide_personality,  
+    llm_decide_personality,
     get_response,        
-    record_audio,        
+    synthesize_speech,
+    tts_cache,
+    TTS_SAMPLE_RATE,
     transcribe_audio_async,
+    transcribe_segments_async,
+    transcription_scheduler,
+    whisper_pool,
+    judge_router,
+    generate_opening_questions,
+    prompt_history,
     PERSONALITY_NAMES    
 )
 from langchain.schema import HumanMessage, AIMessage
-from langchain_community.chat_message_histories import ChatMessageHistory
 from voice.personalities import PERSONALITIES
+from vision.emotion_service import EmotionInferenceService
+from vision.broadcaster import CameraBroadcaster
+from vision.stream import ClientStream
+from voice.streaming import StreamingTranscriber
+from voice.tts_pipeline import PlaybackScheduler
+from voice.output import AudioOutput
+from voice.speculation import SpeculativeTurn, same_turn, speculation_stats
+from voice.question_bank import QuestionBank
+from voice.endpointing import turn_end_cue
+from voice.asr_scheduler import INTERACTIVE, STREAMING
+from prompt_layout import prompt_accounting
+from sessions import DEFAULT_SESSION_ID, PitchSession, SessionLimitError, SessionRegistry
 
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -51,26 +65,42 @@ app.add_middleware(
 )
 
 # -------------------------------
-# EMOTION DETECTION GLOBALS
+# SESSIONS
 # -------------------------------
-is_recording = False
-video_capture = None
-emotion_counts = defaultdict(int)
-total_frames = 0
+# Per-pitch state (emotion counts, chat history, Q&A flags, websockets) lives
+# on a PitchSession; every endpoint takes an optional session_id.
+sessions = SessionRegistry()
 threshold = 5.0
-force_audio_stop = False
+MAX_TIMELINE_WINDOWS = 1000
+# Seconds of a paused answer transcribed to judge whether it is finished
+CUE_SECONDS = 6
 
-# -------------------------------
-# CHAT / Q&A
-# -------------------------------
-chat_history = ChatMessageHistory()
-transcript_messages = []
-chat_active = False
-qna_mode = False
-qna_lock = asyncio.Lock()
-pitch_captured_event = asyncio.Event()
+# Judge replies started in parallel per turn, from the user's first pause;
+# 0 runs routing and the reply one after the other
+SPECULATIVE_JUDGES = int(os.getenv("SPECULATIVE_JUDGES", 2))
+# How long Q&A may wait for an opening-question build still in flight
+QUESTION_BANK_WAIT = float(os.getenv("QUESTION_BANK_WAIT", 2.0))
+
+# Shared by every video stream so faces from all sessions batch together
+emotion_service = EmotionInferenceService()
+
+# Websocket close code for "try again later"
+WS_TRY_AGAIN_LATER = 1013
+
+def unknown_session():
+    return JSONResponse({"error": "Unknown session"}, status_code=404)
 
-transcript_websockets = []
+def session_limit_reached(e: SessionLimitError):
+    return JSONResponse({"error": str(e)}, status_code=503)
+
+@app.on_event("startup")
+async def start_session_eviction():
+    sessions.start_eviction()
+
+@app.on_event("shutdown")
+async def close_sessions():
+    await sessions.close()
+    await transcription_scheduler.close()
 
 # Convert personalities list → dict for easy lookup
 personalities_dict = {p["name"]: p for p in PERSONALITIES}
@@ -82,176 +112,189 @@ judge_voices = {
     "1Password Judge": "VR6AewLTigWG4xSOukaG"
 }
 
-# ElevenLabs streaming client
-elevenlabs_streaming_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
-
-# -------------------------------
-# FORCE AUDIO STOP FLAG
-# -------------------------------
-force_audio_stop = False
-
-active_audio_streams = []
-p = pyaudio.PyAudio()
-
-def play_audio_in_memory(mp3_data: bytes):
-    global active_audio_streams
-    segment = AudioSegment.from_file(io.BytesIO(mp3_data), format="mp3")
-    stream = p.open(
-        format=p.get_format_from_width(segment.sample_width),
-        channels=segment.channels,
-        rate=segment.frame_rate,
-        output=True
-    )
-    active_audio_streams.append(stream)  # Track the stream
-    stream.write(segment.raw_data)
-    stream.stop_stream()
-    stream.close()
-    active_audio_streams.remove(stream)  # Remove when done
-
-def stop_all_audio():
-    """Stop all active audio streams"""
-    global active_audio_streams
-    for stream in active_audio_streams:
-        try:
-            if not stream.is_stopped():
-                stream.stop_stream()
-            stream.close()
-        except:
-            pass  # Ignore errors when stopping streams
-    active_audio_streams.clear()
-
-async def generate_and_play_audio_streaming(text: str, voice_id: str):
-    """
-    Uses ElevenLabs streaming TTS to play audio in real-time
-    *without* blocking transcript updates.
-    This checks force_audio_stop to immediately break if /stop was called.
-    """
-    global force_audio_stop, active_audio_streams
-    try:
-        audio_stream = elevenlabs_streaming_client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_monolingual_v1",
-            stream=True
-        )
-        
-        # Create PyAudio stream
-        p_stream = p.open(
-            format=pyaudio.paFloat32,
-            channels=1,
-            rate=44100,
-            output=True
+def session_playback(session: PitchSession) -> PlaybackScheduler:
+    """The session's playback queue; every judge utterance goes through it."""
+    if session.playback is None:
+        if session.audio_output is None:
+            session.audio_output = AudioOutput(TTS_SAMPLE_RATE)
+        output = session.audio_output
+
+        async def synthesize(text: str, voice_id: str, previous: str) -> bytes:
+            return await asyncio.to_thread(synthesize_speech, text, voice_id, previous)
+
+        async def play_pcm(pcm: bytes):
+            if not session.force_audio_stop:
+                await output.play(pcm)
+
+        session.playback = PlaybackScheduler(synthesize, play_pcm, stop_audio=output.interrupt)
+    return session.playback
+
+def session_question_bank(session: PitchSession) -> QuestionBank:
+    """The session's opening-question bank, fed by the pitch transcript."""
+    if session.question_bank is None:
+        async def synthesize(text: str, voice_id: str):
+            # Warms the TTS cache, so the opener plays without synthesis
+            return await asyncio.to_thread(synthesize_speech, text, voice_id)
+
+        session.question_bank = QuestionBank(
+            PERSONALITY_NAMES,
+            generate_opening_questions,
+            decide_personality,
+            synthesize,
+            judge_voices,
         )
-        active_audio_streams.append(p_stream)
-        
-        for chunk in audio_stream:
-            if force_audio_stop:
-                break
-            await asyncio.to_thread(play, chunk)
-            
-        if p_stream in active_audio_streams:
-            active_audio_streams.remove(p_stream)
-        p_stream.stop_stream()
-        p_stream.close()
-            
-    except Exception as e:
-        if not force_audio_stop:  # Only log if it's not due to forced stop
-            print(f"TTS Streaming Error: {e}")
+    return session.question_bank
 
 # -------------------------------
 # WEBCAM / EMOTION
 # -------------------------------
+def session_video(session: PitchSession, camera: int) -> CameraBroadcaster:
+    """The session's camera producer, shared by every /ws viewer of the session."""
+    if session.video is None or (session.video.source != camera and not session.video.running):
+        session.video = CameraBroadcaster(
+            emotion_service,
+            source=camera,
+            on_emotion=session.record_emotion,
+            on_start=session.reset_emotion_data,
+            on_stop=lambda: session.save_emotion_data(threshold),
+        )
+    return session.video
+
 @app.websocket("/ws")
-async def webcam_feed(websocket: WebSocket):
-    global is_recording, video_capture, emotion_counts, total_frames
+async def webcam_feed(
+    websocket: WebSocket,
+    session_id: str = DEFAULT_SESSION_ID,
+    quality: str = "high",
+    camera: int = 0,
+):
+    """quality selects the client's JPEG ladder: "high", "medium" or "low"."""
     await websocket.accept()
-
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
-    video_capture = cv2.VideoCapture(0)
-
-    if not video_capture.isOpened():
-        await websocket.send_json({"error": "Unable to access the webcam."})
-        await websocket.close()
+    try:
+        session = sessions.get(session_id)
+    except SessionLimitError:
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
         return
-
-    is_recording = True
-    emotion_counts.clear()
-    total_frames = 0
-
     try:
-        while is_recording:
-            ret, frame = video_capture.read()
-            if not ret:
-                break
-
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30,30))
-            if len(faces) > 0:
-                x, y, w, h = faces[0]
-                roi = frame[y:y+h, x:x+w]
-                try:
-                    result = DeepFace.analyze(roi, actions=["emotion"], enforce_detection=False)
-                    dom_emotion = max(result[0]["emotion"].items(), key=lambda x: x[1])[0]
-                    emotion_counts[dom_emotion]+=1
-                    total_frames+=1
-
-                    cv2.rectangle(frame, (x,y), (x+w,y+h), (0,255,0),2)
-                    cv2.putText(frame, dom_emotion, (x,y-10),
-                                cv2.FONT_HERSHEY_SIMPLEX,0.9,(0,255,0),2)
-                except Exception as e:
-                    print(f"Emotion analysis error: {e}")
-
-            _, buf = cv2.imencode(".jpg", frame)
-            await websocket.send_bytes(buf.tobytes())
-            await asyncio.sleep(0.03)
-
+        served = await session_video(session, camera).serve(
+            ClientStream(websocket.send_bytes, quality=quality)
+        )
+        if not served:
+            await websocket.send_json({"error": "Unable to access the webcam."})
+            await websocket.close()
     except WebSocketDisconnect:
         print("Video WebSocket disconnected.")
-    finally:
-        video_capture.release()
-        cv2.destroyAllWindows()
-        if total_frames>0:
-            save_emotion_data()
+
+@app.get("/video_stats")
+async def video_stats(session_id: str = DEFAULT_SESSION_ID):
+    """Per-stage timing, drop counters and fan-out of the session's camera pipeline."""
+    session = sessions.find(session_id)
+    if session is None or session.video is None:
+        return {}
+    return session.video.stats()
 
 @app.websocket("/ws_transcript")
-async def transcript_feed(websocket: WebSocket):
+async def transcript_feed(websocket: WebSocket, session_id: str = DEFAULT_SESSION_ID):
     await websocket.accept()
-    transcript_websockets.append(websocket)
+    try:
+        session = sessions.get(session_id)
+    except SessionLimitError:
+        await websocket.close(code=WS_TRY_AGAIN_LATER)
+        return
+    session.transcript_websockets.append(websocket)
     print("Transcript WebSocket connected.")
     try:
         while True:
             await websocket.receive_text()
+            session.touch()
     except WebSocketDisconnect:
-        transcript_websockets.remove(websocket)
+        if websocket in session.transcript_websockets:
+            session.transcript_websockets.remove(websocket)
         print("Transcript WebSocket disconnected.")
 
-def save_emotion_data():
-    global total_frames, emotion_counts, threshold
-    if total_frames>0:
-        perc = {k:(v/total_frames*100) for k,v in emotion_counts.items()}
-        fil = {k:v for k,v in perc.items() if v>=threshold}
-        sorted_e = dict(sorted(fil.items(), key=lambda x:x[1], reverse=True))
-        with open("emotion_data.json","w") as f:
-            json.dump(sorted_e,f,indent=4)
-        print("Saved emotion_data.json")
+@app.get("/emotion_timeline")
+async def emotion_timeline(
+    session_id: str = DEFAULT_SESSION_ID,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    resolution: Optional[float] = None,
+):
+    """
+    Emotion mix over [start, end) seconds of the session's pitch, or with
+    resolution set, one mix per window of that many seconds.
+    """
+    session = sessions.find(session_id)
+    if session is None:
+        return unknown_session()
+    timeline = session.emotion_timeline
+    out = {
+        "duration": timeline.duration,
+        "bucket_seconds": timeline.bucket_seconds,
+        "mix": timeline.mix(start, end),
+    }
+    if resolution:
+        # Never finer than one bucket, nor more than MAX_TIMELINE_WINDOWS windows
+        resolution = max(resolution, timeline.bucket_seconds, timeline.duration / MAX_TIMELINE_WINDOWS)
+        out["resolution"] = resolution
+        out["series"] = timeline.series(resolution)
+    return out
+
+@app.get("/emotion_stats")
+async def emotion_stats():
+    """Batch size and latency of the shared emotion inference service."""
+    return emotion_service.stats()
+
+@app.get("/asr_stats")
+async def asr_stats():
+    """Whisper pool usage plus transcription queue depth and wait per lane."""
+    return {"pool": whisper_pool.stats(), "scheduler": transcription_scheduler.stats()}
+
+@app.get("/tts_stats")
+async def tts_stats():
+    """Hit/miss counters and size of the synthesized speech cache."""
+    return tts_cache.stats()
+
+@app.get("/router_stats")
+async def router_stats():
+    """Local router fallback rate, and how often speculative replies were used."""
+    return {"router": judge_router.stats(), "speculation": dict(speculation_stats)}
+
+@app.get("/prompt_stats")
+async def prompt_stats():
+    """Static prefix size and input tokens per call for each judge prompt."""
+    return prompt_accounting.stats()
+
+@app.get("/sessions")
+async def list_sessions():
+    """Active sessions, for load testing and monitoring."""
+    return {"count": len(sessions), "sessions": [s.summary() for s in sessions]}
 
 @app.get("/stop")
-async def stop_all():
+async def stop_all(session_id: str = DEFAULT_SESSION_ID):
     """
-    Called when the user clicks Stop. Immediately halts:
+    Called when the user clicks Stop. Immediately halts, for this session only:
     - Audio playback (through force_audio_stop)
     - Q&A loops (chat_active / qna_mode = False)
     - Webcam feed
     """
-    global is_recording, chat_active, qna_mode, force_audio_stop
-    force_audio_stop = True      # Stop ongoing TTS
-    stop_all_audio()            # Immediately stop all audio
-    is_recording = False
-    chat_active = False
-    qna_mode = False
-    pitch_captured_event.set()
+    session = sessions.find(session_id)
+    if session is None:
+        return unknown_session()
+    session.force_audio_stop = True      # Stop ongoing TTS
+    if session.playback is not None:
+        session.playback.flush()        # Drop queued speech and stop what's playing mid-buffer
+    if session.video is not None:
+        session.video.stop()
+    if session.microphone is not None:
+        session.microphone.pause()
+        session.microphone.flush()
+    session.chat_active = False
+    session.qna_mode = False
+    session.end_pitch()
+    session.cancel_speculation()
+    if session.question_bank is not None:
+        session.question_bank.cancel()
+    session.pitch_captured_event.set()
+    transcription_scheduler.cancel(session.session_id)
 
     return JSONResponse({"message": "Session stopped."})
 
@@ -259,162 +302,288 @@ async def stop_all():
 # START CHAT
 # -------------------------------
 @app.get("/start_chat")
-async def start_chat(bg: BackgroundTasks):
-    global chat_active, qna_mode, chat_history, transcript_messages, force_audio_stop
-    chat_active = True
-    qna_mode = False
-    chat_history = ChatMessageHistory()
-    transcript_messages = []
-
-    # Reset the forced stop so new TTS can happen
-    force_audio_stop = False
-
-    pitch_captured_event.clear()
-    bg.add_task(pitch_capture_task)
-    return {"message":"Chat session started (capturing pitch)."}
-
-async def pitch_capture_task():
-    global chat_active, chat_history, transcript_messages
-    if not chat_active:
+async def start_chat(session_id: str = DEFAULT_SESSION_ID, continuous: bool = True):
+    """
+    Start capturing the pitch. With continuous=True (the default) the pitch is
+    recorded until /end_pitch, /begin_qna or /stop, and partial transcripts are
+    pushed to /ws_transcript as it goes. Otherwise the pitch ends at the first
+    long pause.
+    """
+    try:
+        session = sessions.get(session_id)
+    except SessionLimitError as e:
+        return session_limit_reached(e)
+    # Fresh history and flags; also resets the forced stop so new TTS can happen
+    session.reset_chat()
+    session.spawn(pitch_capture_task(session, continuous))
+    return {"message":"Chat session started (capturing pitch).", "session_id": session.session_id}
+
+@app.get("/end_pitch")
+async def end_pitch(session_id: str = DEFAULT_SESSION_ID):
+    session = sessions.find(session_id)
+    if session is None:
+        return unknown_session()
+    session.end_pitch()
+    return {"message":"Pitch capture ending."}
+
+async def pitch_capture_task(session: PitchSession, continuous: bool = True):
+    if not session.chat_active:
         return
 
-    pitch_audio = await asyncio.to_thread(record_audio,16000,220,100,2)
-    pitch_text = await transcribe_audio_async(pitch_audio)
+    microphone = await session.audio_input()
+    # /stop, /end_pitch or /begin_qna may have come in while the mic was opening
+    if not session.chat_active or session.pitch_ended:
+        if session.chat_active:
+            await broadcast_transcript(session, ("System","No pitch captured."))
+        session.pitch_captured_event.set()
+        return
+    if continuous:
+        # The transcriber taps the stream; Q&A utterances aren't cut until it ends
+        microphone.pause()
+
+        async def send_partial(text: str):
+            await broadcast_transcript(session, ("User (Pitch)", text), partial=True)
+            # Draft opening questions while the pitch is still going
+            if session.chat_active:
+                session_question_bank(session).update(text)
+
+        async def transcribe_pitch(audio, final: bool):
+            # Partials are background work; the final pass is what Q&A waits on
+            lane = INTERACTIVE if final else STREAMING
+            return await transcribe_segments_async(audio, lane=lane, owner=session.session_id)
+
+        session.pitch_transcriber = StreamingTranscriber(microphone, transcribe_pitch, on_partial=send_partial)
+        try:
+            pitch_text = await session.pitch_transcriber.run()
+        finally:
+            session.pitch_transcriber = None
+    else:
+        microphone.resume()
+        pitch_audio = await microphone.next_utterance()
+        pitch_text = await transcribe_audio_async(pitch_audio, owner=session.session_id)
     pitch_text = pitch_text.strip()
 
+    if not session.chat_active:
+        # Stopped; nobody will ask about this pitch
+        session.pitch_captured_event.set()
+        return
     if pitch_text:
-        chat_history.add_message(HumanMessage(content=pitch_text))
-        transcript_messages.append(("User (Pitch)", pitch_text))
-        await broadcast_transcript(("User (Pitch)", pitch_text))
+        session_question_bank(session).update(pitch_text, final=True)
+        session.chat_history.add_message(HumanMessage(content=pitch_text))
+        session.transcript_messages.append(("User (Pitch)", pitch_text))
+        await broadcast_transcript(session, ("User (Pitch)", pitch_text))
     else:
-        await broadcast_transcript(("System","No pitch captured."))
+        await broadcast_transcript(session, ("System","No pitch captured."))
 
-    pitch_captured_event.set()
+    session.pitch_captured_event.set()
 
 # -------------------------------
 # Q&A
 # -------------------------------
 @app.get("/begin_qna")
-async def begin_qna(bg: BackgroundTasks):
-    global qna_mode
-    if qna_lock.locked():
+async def begin_qna(session_id: str = DEFAULT_SESSION_ID):
+    session = sessions.find(session_id)
+    if session is None:
+        return unknown_session()
+    if session.qna_lock.locked():
         return JSONResponse({"message":"Q&A session already active"}, status_code=400)
 
-    qna_mode = True
-    bg.add_task(qna_loop)
+    # Q&A starts where the pitch ends
+    session.end_pitch()
+
+    session.qna_mode = True
+    session.spawn(qna_loop(session))
     return {"message":"Q&A mode started. Judges can respond."}
 
-async def qna_loop():
-    global chat_active, qna_mode, chat_history, transcript_messages, force_audio_stop
-    async with qna_lock:
-        try:
-            await pitch_captured_event.wait()
+def judge_say(session: PitchSession, judge: str):
+    """Callable that queues one of judge's sentences for playback, or None if it stays silent."""
+    if judge not in judge_voices or session.force_audio_stop:
+        return None
+    playback = session_playback(session)
+    return lambda sentence: playback.say(judge_voices[judge], sentence)
+
+async def record_judge_message(session: PitchSession, judge: str, message: str):
+    session.chat_history.add_message(AIMessage(content=message))
+    session.transcript_messages.append((judge, message))
+    await broadcast_transcript(session, (judge, message))
+
+async def open_from_bank(session: PitchSession) -> bool:
+    """Open Q&A with the best pre-built question, if the bank has one; True if it did."""
+    if session.question_bank is None:
+        return False
+    question = await session.question_bank.opener(timeout=QUESTION_BANK_WAIT)
+    if question is None:
+        return False
+    say = judge_say(session, question.judge)
+    if say is not None:
+        for sentence in question.sentences():
+            say(sentence)
+    await record_judge_message(session, question.judge, question.text)
+    return True
+
+async def judge_reply(session: PitchSession, judge: str, user_input: str):
+    """
+    One judge turn: the reply is queued for speech sentence by sentence while
+    it streams in, then recorded and broadcast once complete. Playback
+    carries on in the background, after anything already queued.
+    """
+    route, target, message = await get_response(
+        personality_name=judge,
+        history=formatted_history(session),
+        user_input=user_input,
+        say=judge_say(session, judge),
+        speak=False
+    )
+    await record_judge_message(session, judge, message)
+    return route, target, message
+
+def named_judge(text: str) -> Optional[str]:
+    for name in PERSONALITY_NAMES:
+        if name.lower() in text.lower():
+            return name
+    return None
+
+def speculate(session: PitchSession, user_text: str, history: str) -> SpeculativeTurn:
+    """Start routing and the top candidate judges' replies to user_text at once."""
+    async def respond(judge, user_input, say):
+        return await get_response(
+            personality_name=judge,
+            history=history,
+            user_input=user_input,
+            say=say,
+            speak=False
+        )
+
+    # The turn is routed once, in SpeculativeTurn; only the LLM fallback is passed
+    return SpeculativeTurn(user_text, judge_router, llm_decide_personality, respond, k=SPECULATIVE_JUDGES)
+
+async def speculative_reply(session: PitchSession, user_text: str):
+    """
+    Judge turn for user_text (already in the chat history). Reuses the
+    speculation started at the user's last pause if the final transcript
+    matches it; otherwise speculates from scratch.
+    """
+    spec, session.speculation = session.speculation, None
+    if spec is not None and not same_turn(spec.user_text, user_text):
+        spec.cancel()
+        spec = None
+    if spec is None:
+        spec = speculate(session, user_text, formatted_history(session))
+    else:
+        speculation_stats["early_starts"] += 1
+    judge, route, target, message = await spec.resolve(lambda j: judge_say(session, j))
+    await record_judge_message(session, judge, message)
+    return judge, route, target, message
 
-            while chat_active and qna_mode:
+async def qna_loop(session: PitchSession):
+    async with session.qna_lock:
+        try:
+            await session.pitch_captured_event.wait()
+            # Speech from here on counts as answers, including any that
+            # starts while a judge is still being generated
+            microphone = await session.audio_input()
+            microphone.resume()
+
+            async def end_of_turn_cue(audio):
+                # Cancelled by the capture service if the user carries on talking,
+                # and ignored if its turn has been answered by the time it's done
+                turn = session.user_turns
+                # The last few seconds are enough to tell whether the answer trails off
+                tail = await transcribe_audio_async(audio[-CUE_SECONDS * 16000:], lane=STREAMING, owner=session.session_id)
+                microphone.endpointer.hint(tail)
+                # If the answer may be finished, start on the reply before the turn ends
+                if not SPECULATIVE_JUDGES or turn_end_cue(tail) == "continue":
+                    return
+                text = await transcribe_audio_async(audio, lane=STREAMING, owner=session.session_id)
+                text = text.strip()
+                if text and not named_judge(text) and session.user_turns == turn and session.qna_mode:
+                    session.cancel_speculation()
+                    history = formatted_history(session) + f"User: {text}\n"
+                    session.speculation = speculate(session, text, history)
+
+            microphone.on_pause = end_of_turn_cue
+
+            while session.chat_active and session.qna_mode:
                 # If only pitch is present => first judge
-                if len(chat_history.messages) == 1:
-                    initial_judge = await decide_personality("Start Q&A based on the pitch.")
-                    route, target, message = await get_response(
-                        personality_name=initial_judge,
-                        history=formatted_history(chat_history),
-                        user_input="Start Q&A"
-                    )
-                    chat_history.add_message(AIMessage(content=message))
-                    transcript_messages.append((initial_judge, message))
-                    # 1) Broadcast text
-                    await broadcast_transcript((initial_judge, message))
-                    # 2) If we want TTS, do it concurrently
-                    if initial_judge in judge_voices and not force_audio_stop:
-                        asyncio.create_task(generate_and_play_audio_streaming(message, judge_voices[initial_judge]))
+                if len(session.chat_history.messages) == 1 and not await open_from_bank(session):
+                    # Route on the pitch itself, so its topic picks the first judge
+                    initial_judge = await decide_personality(session.chat_history.messages[0].content)
+                    route, target, message = await judge_reply(session, initial_judge, "Start Q&A")
 
                     # If route=1 => pass
                     if route == 1 and target in PERSONALITY_NAMES:
-                        r2, t2, msg2 = await get_response(
-                            personality_name=target,
-                            history=formatted_history(chat_history),
-                            user_input=message
-                        )
-                        chat_history.add_message(AIMessage(content=msg2))
-                        transcript_messages.append((target, msg2))
-                        await broadcast_transcript((target, msg2))
-                        if target in judge_voices and not force_audio_stop:
-                            asyncio.create_task(generate_and_play_audio_streaming(msg2, judge_voices[target]))
-
-                user_audio = await asyncio.to_thread(record_audio,16000,220,100,2)
-                user_text = await transcribe_audio_async(user_audio)
+                        await judge_reply(session, target, message)
+
+                user_audio = await microphone.next_utterance()
+                user_text = await transcribe_audio_async(user_audio, owner=session.session_id)
                 user_text = user_text.strip()
                 if not user_text:
                     continue
 
-                chat_history.add_message(HumanMessage(content=user_text))
-                transcript_messages.append(("User", user_text))
-                await broadcast_transcript(("User", user_text))
+                session.chat_history.add_message(HumanMessage(content=user_text))
+                session.transcript_messages.append(("User", user_text))
+                await broadcast_transcript(session, ("User", user_text))
                 # User => no TTS for user
 
-                chosen_judge = None
-                for p in PERSONALITY_NAMES:
-                    if p.lower() in user_text.lower():
-                        chosen_judge = p
-                        break
-                if not chosen_judge:
+                # Pause cues still running belong to this turn; from here they're stale
+                session.user_turns += 1
+                chosen_judge = named_judge(user_text)
+                if chosen_judge:
+                    session.cancel_speculation()
+                    route, target, message = await judge_reply(session, chosen_judge, user_text)
+                elif SPECULATIVE_JUDGES:
+                    chosen_judge, route, target, message = await speculative_reply(session, user_text)
+                else:
                     chosen_judge = await decide_personality(user_text)
-
-                route, target, message = await get_response(
-                    personality_name=chosen_judge,
-                    history=formatted_history(chat_history),
-                    user_input=user_text
-                )
-                chat_history.add_message(AIMessage(content=message))
-                transcript_messages.append((chosen_judge, message))
-                # 1) broadcast text first
-                await broadcast_transcript((chosen_judge, message))
-                # 2) TTS concurrently
-                if chosen_judge in judge_voices and not force_audio_stop:
-                    asyncio.create_task(generate_and_play_audio_streaming(message, judge_voices[chosen_judge]))
+                    route, target, message = await judge_reply(session, chosen_judge, user_text)
 
                 if route == 1 and target in PERSONALITY_NAMES:
-                    r2, t2, msg2 = await get_response(
-                        personality_name=target,
-                        history=formatted_history(chat_history),
-                        user_input=message
-                    )
-                    chat_history.add_message(AIMessage(content=msg2))
-                    transcript_messages.append((target, msg2))
-                    await broadcast_transcript((target, msg2))
-                    if target in judge_voices and not force_audio_stop:
-                        asyncio.create_task(generate_and_play_audio_streaming(msg2, judge_voices[target]))
+                    await judge_reply(session, target, message)
 
         except Exception as e:
             print(f"Error in Q&A loop: {e}")
-            await broadcast_transcript(("System","An error occurred during Q&A."))
+            await broadcast_transcript(session, ("System","An error occurred during Q&A."))
         finally:
-            qna_mode = False
+            session.qna_mode = False
+            session.cancel_speculation()
+            if session.microphone is not None:
+                session.microphone.on_pause = None
+                # Nobody reads utterances between Q&A rounds
+                session.microphone.pause()
 
 # -------------------------------
 # broadcast_transcript
 # -------------------------------
-async def broadcast_transcript(msg: tuple):
-    # Just send the text out *immediately*
-    data = {"speaker": msg[0], "text": msg[1]}
+async def broadcast_transcript(session: PitchSession, msg: tuple, partial: bool = False):
+    # Just send the text out *immediately*. Partial messages are live
+    # hypotheses that the next message from the same speaker replaces.
+    data = {"speaker": msg[0], "text": msg[1], "partial": partial}
     to_remove = []
-    for ws in transcript_websockets:
+    for ws in session.transcript_websockets:
         try:
             await ws.send_json(data)
         except:
             to_remove.append(ws)
     for dead_ws in to_remove:
-        transcript_websockets.remove(dead_ws)
+        session.transcript_websockets.remove(dead_ws)
 
-def formatted_history(chat_history: ChatMessageHistory) -> str:
-    out = ""
-    for i, m in enumerate(chat_history.messages):
+def formatted_history(session: PitchSession) -> str:
+    """
+    The session's chat as judge prompt history: the pitch, a summary of
+    older turns and the recent turns verbatim. Only messages added since
+    the last call are formatted.
+    """
+    if session.prompt_history is None:
+        session.prompt_history = prompt_history(pinned=1)
+    history = session.prompt_history
+    for i, m in enumerate(session.chat_history.messages[history.messages:], start=history.messages):
         if i==0:
-            out += f"User (Pitch): {m.content}\n"
+            history.add("User (Pitch)", m.content)
         elif isinstance(m, HumanMessage):
-            out += f"User: {m.content}\n"
+            history.add("User", m.content)
         else:
-            out += f"Assistant: {m.content}\n"
-    return out
+            history.add("Assistant", m.content)
+    return history.render()
 
 # ------------------------------------------------
 # Transcript + Pitch Evaluate
@@ -449,7 +618,7 @@ def create_transcript_json(transcript_data, wpm, time_spent, emotion_data=None):
     return data
 
 @app.post("/generate_analysis")
-async def generate_analysis(data: TimerData):
+async def generate_analysis(data: TimerData, session_id: str = DEFAULT_SESSION_ID):
     try:
         t_spent = calculate_time_spent(data.time_left)
         # example: compute real WPM
@@ -457,12 +626,14 @@ async def generate_analysis(data: TimerData):
         time_in_minutes = (300 - data.time_left)/60
         wpm = (total_words/time_in_minutes) if time_in_minutes>0 else 0
 
-        emotion_data = None
-        try:
-            with open("emotion_data.json","r") as f:
-                emotion_data = json.load(f)
-        except:
-            print("No valid emotion_data.json found.")
+        session = sessions.find(session_id)
+        emotion_data = session.emotion_data if session else None
+        if emotion_data is None:
+            try:
+                with open("emotion_data.json","r") as f:
+                    emotion_data = json.load(f)
+            except:
+                print("No valid emotion_data.json found.")
 
         res = create_transcript_json(data.transcript, wpm, t_spent, emotion_data)
         if not res:
@@ -4,6 +4,7 @@ from collections import defaultdict
 import json
 import os
 from grader.json_converter import create_transcript_json
+from vision.face_tracker import FaceTracker
 
 def run_emotion_detection(threshold=5.0, transcript_file=None, wpm=None, time=None):
     previous_emotion = None
@@ -11,8 +12,8 @@ def run_emotion_detection(threshold=5.0, transcript_file=None, wpm=None, time=No
     total_frames = 0
     saved_flag = False
 
-    # Load face cascade classifier
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    # Detect on a downscaled frame every few frames and track faces in between
+    tracker = FaceTracker()
 
     # Start capturing video from the webcam
     cap = cv2.VideoCapture(0)
@@ -34,8 +35,8 @@ def run_emotion_detection(threshold=5.0, transcript_file=None, wpm=None, time=No
         # Convert the frame to grayscale
         gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-        # Detect faces in the frame
-        faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        # Locate faces in the frame
+        faces = tracker.update(gray_frame)
 
         if len(faces) > 0:
             x, y, w, h = faces[0]
@@ -0,0 +1,208 @@
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+
+from vision.emotion_timeline import EmotionTimeline
+
+# -------------------------------------------------
+# Offline analysis of an uploaded pitch video
+# -------------------------------------------------
+# The video is split into frame-range shards that worker processes decode
+# and classify independently (each seeks to its start frame and only decodes
+# the frames it samples). Containers that don't report a frame count (WebM,
+# some phone recordings) are decoded as one shard, front to back. Audio is
+# decoded and transcribed on a thread at the same time. Nothing holds the
+# whole video in memory.
+
+
+@dataclass
+class PitchAnalysisJob:
+    job_id: str
+    video_path: str
+    status: str = "queued"            # queued | running | done | error
+    shards_total: int = 0
+    shards_done: int = 0
+    audio_status: str = "pending"     # pending | running | done | error
+    started_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+
+    def progress(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out.pop("result")
+        out["frames_progress"] = (self.shards_done / self.shards_total) if self.shards_total else 0.0
+        return out
+
+
+# job_id -> job, for progress polling
+jobs: Dict[str, PitchAnalysisJob] = {}
+
+
+def new_job(video_path: str, job_id: Optional[str] = None) -> PitchAnalysisJob:
+    job = PitchAnalysisJob(job_id=job_id or uuid.uuid4().hex, video_path=video_path)
+    jobs[job.job_id] = job
+    return job
+
+
+def _video_info(path: str) -> Tuple[int, float]:
+    cap = cv2.VideoCapture(path)
+    try:
+        frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        cap.release()
+    return frames, fps
+
+
+def _analyze_shard(path: str, start: int, end: Optional[int], fps: float, sample_hz: float) -> List[Tuple[float, Dict[str, float]]]:
+    """Presenter emotion samples (seconds, scores) for frames [start, end), or to the last frame if end is None."""
+    # Imported here so only the worker processes load the model
+    from vision.emotion_service import _classify_one
+    from vision.face_tracker import FaceTracker
+
+    step = max(1, int(round(fps / sample_hz)))
+    tracker = FaceTracker(detect_every=1)
+    samples = []
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        # First sampled frame on the global grid so shards don't double up
+        first = ((start + step - 1) // step) * step
+        for idx in (range(start, end) if end is not None else itertools.count(start)):
+            if idx < first or (idx - first) % step:
+                if not cap.grab():  # advance without the BGR conversion and copy read() does
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            faces = tracker.update(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            if not faces:
+                continue
+            x, y, w, h = faces[0]
+            emotions = _classify_one(frame[y:y+h, x:x+w])
+            if emotions:
+                samples.append((idx / fps, emotions))
+    finally:
+        cap.release()
+    return samples
+
+
+def _decode_audio(path: str):
+    from faster_whisper import decode_audio
+
+    return decode_audio(path, sampling_rate=16000)
+
+
+def _summarize(samples: List[Tuple[float, Dict[str, float]]], threshold: float) -> Dict[str, Any]:
+    counts = defaultdict(int)
+    timeline = EmotionTimeline()
+    for t, emotions in samples:
+        counts[max(emotions.items(), key=lambda x: x[1])[0]] += 1
+        timeline.add(emotions, t)
+    total = len(samples)
+    perc = {k: v / total * 100 for k, v in counts.items()} if total else {}
+    fil = {k: v for k, v in perc.items() if v >= threshold}
+    return {
+        "emotions": dict(sorted(fil.items(), key=lambda x: x[1], reverse=True)),
+        "emotion_timeline": timeline.series(60.0),
+    }
+
+
+async def run_analysis_job(
+    job: PitchAnalysisJob,
+    workers: Optional[int] = None,
+    sample_hz: float = 2.0,
+    shard_seconds: float = 30.0,
+    threshold: float = 5.0,
+):
+    """Analyse job.video_path, updating the job's progress as shards finish."""
+    loop = asyncio.get_running_loop()
+    job.status = "running"
+    workers = workers or max(1, (os.cpu_count() or 2) // 2)
+    audio_task = None
+    try:
+        frames, fps = await asyncio.to_thread(_video_info, job.video_path)
+        if frames > 0:
+            shard_frames = max(1, int(shard_seconds * fps))
+            shards = [(s, min(s + shard_frames, frames)) for s in range(0, frames, shard_frames)]
+        else:
+            # No frame count to split on; read sequentially until the decoder runs out
+            frames = 0
+            shards = [(0, None)]
+        job.shards_total = len(shards)
+
+        async def transcribe():
+            job.audio_status = "running"
+            try:
+                from voice.asr_scheduler import BULK
+                from voice.chatbot import transcribe_long_audio_async, transcription_scheduler
+
+                audio = await asyncio.to_thread(_decode_audio, job.video_path)
+                # Bulk lane: behind any interactive or streaming work queued in
+                # this process's scheduler (the live Q&A backend has its own)
+                result = await transcribe_long_audio_async(audio, lane=BULK, owner=job.job_id)
+                job.audio_status = "done"
+                return result
+            except asyncio.CancelledError:
+                transcription_scheduler.cancel(job.job_id)
+                job.audio_status = "error"
+                raise
+            except Exception as e:
+                job.audio_status = "error"
+                print(f"Audio transcription error: {e}")
+                return {"text": "", "words": [], "rtf": None, "duration": frames / fps}
+
+        audio_task = asyncio.create_task(transcribe())
+
+        samples = []
+        # Spawned, not forked: the server process has threads running
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        try:
+            futures = [
+                loop.run_in_executor(pool, _analyze_shard, job.video_path, start, end, fps, sample_hz)
+                for start, end in shards
+            ]
+            for fut in asyncio.as_completed(futures):
+                samples.extend(await fut)
+                job.shards_done += 1
+        finally:
+            # Waiting for the workers to exit must not block the event loop
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+        samples.sort(key=lambda s: s[0])
+
+        audio = await audio_task
+        duration = audio["duration"] or frames / fps or (samples[-1][0] if samples else 0.0)
+        if not duration and not samples:
+            raise RuntimeError("No video frames or audio could be decoded")
+        words = len(audio["text"].split())
+        minutes = duration / 60.0
+        job.result = {
+            "transcript": audio["text"],
+            "words": audio["words"],
+            "transcription_rtf": audio["rtf"],
+            "wpm": (words / minutes) if minutes > 0 else 0,
+            "time": f"{int(duration // 60)}:{str(int(duration % 60)).zfill(2)}",
+            **_summarize(samples, threshold),
+        }
+        job.status = "done"
+    except Exception as e:
+        job.status = "error"
+        job.error = str(e)
+        print(f"Pitch analysis error: {e}")
+    finally:
+        if audio_task is not None and not audio_task.done():
+            audio_task.cancel()
+        job.finished_at = time.time()
@@ -1,8 +1,9 @@
-from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from typing import Dict, Any
 import json
 
+from prompt_layout import stable_prompt
+
 # Sponsor-specific rubrics
 SPONSOR_RUBRICS = {
     "rbc_challenge": {
@@ -99,15 +100,18 @@ EVALUATION_RUBRIC = {
     }
 }
 
-def get_judge_prompt_template(persona: Dict[str, str]) -> PromptTemplate:
-    """Creates a prompt template for a specific judge persona."""
+def get_judge_prompt_template(persona: Dict[str, str]):
+    """
+    Creates the prompt for a specific judge persona. The persona, sponsor
+    challenge and output format form a static prefix; the rubric and then
+    the pitch, which change per request, come last.
+    """
     
-    # Base evaluation template
+    # Static prefix: identical for every evaluation by this judge
     base_template = (
         f"You are a judge from {persona['company']} evaluating hackathon projects.\n"
         f"Background: {persona['background']}\n"
         f"Evaluation Style: {persona['evaluation_bias']}\n\n"
-        "Project Pitch Details:\n{pitch_details}\n\n"
     )
     
     # Add sponsor challenge context if applicable
@@ -118,51 +122,50 @@ def get_judge_prompt_template(persona: Dict[str, str]) -> PromptTemplate:
         )
     
     base_template += (
-        "Evaluation Rubric:\n{rubric}\n\n"
         "Please provide your evaluation in JSON format with this exact structure:\n"
-        "{{\n"  # Note the double braces for escaping
-        '    "main_evaluation": {{\n'  # Double braces here too
-        '        "scores": {{\n'
+        "{\n"
+        '    "main_evaluation": {\n'
+        '        "scores": {\n'
         '            "practicality_and_impact": 8.5,\n'
         '            "pitching": 7.5,\n'
         '            "design": 8.0,\n'
         '            "completion": 9.0,\n'
         '            "theme_and_originality": 8.0\n'
-        "        }},\n"
-        '        "feedback": {{\n'
+        "        },\n"
+        '        "feedback": {\n'
         '            "practicality_and_impact": "Your detailed feedback here",\n'
         '            "pitching": "Your detailed feedback here",\n'
         '            "design": "Your detailed feedback here",\n'
         '            "completion": "Your detailed feedback here",\n'
         '            "theme_and_originality": "Your detailed feedback here"\n'
-        "        }},\n"
+        "        },\n"
         '        "overall_feedback": "Your overall perspective of the project",\n'
         '        "key_points": [\n'
         '            "Key strength or weakness 1",\n'
         '            "Key strength or weakness 2",\n'
         '            "Key strength or weakness 3"\n'
         "        ]\n"
-        "    }}"
+        "    }"
     )
     
     # Add sponsor challenge evaluation if applicable
     if "sponsor_challenge" in persona:
         base_template += ',\n'
         base_template += (
-            '    "sponsor_challenge_evaluation": {{\n'
+            '    "sponsor_challenge_evaluation": {\n'
             f'        "challenge_name": "{persona["sponsor_challenge"]["name"]}",\n'
-            '        "scores": {{\n'
+            '        "scores": {\n'
             '            "cyber_security": 0.0,\n'
             '            "student_focus": 0.0,\n'
             '            "implementation_feasibility": 0.0,\n'
             '            "regulatory_compliance": 0.0\n'
-            "        }},\n"
-            '        "feedback": {{\n'
+            "        },\n"
+            '        "feedback": {\n'
             '            "cyber_security": "Your detailed feedback here",\n'
             '            "student_focus": "Your detailed feedback here",\n'
             '            "implementation_feasibility": "Your detailed feedback here",\n'
             '            "regulatory_compliance": "Your detailed feedback here"\n'
-            "        }},\n"
+            "        },\n"
             '        "challenge_specific_feedback": "Your overall assessment for the sponsor challenge",\n'
             '        "key_strengths": [\n'
             '            "Strength 1",\n'
@@ -174,14 +177,17 @@ def get_judge_prompt_template(persona: Dict[str, str]) -> PromptTemplate:
             '            "Area 2",\n'
             '            "Area 3"\n'
             "        ]\n"
-            "    }}"
+            "    }"
         )
     
-    base_template += "\n}}"  # Close the main JSON object
+    base_template += "\n}\n\n"  # Close the main JSON object
     
-    return PromptTemplate(
+    return stable_prompt(
+        f"evaluation:{persona['name']}",
+        base_template,
+        "Evaluation Rubric:\n{rubric}\n\n"
+        "Project Pitch Details:\n{pitch_details}\n",
         input_variables=["pitch_details", "rubric"],
-        template=base_template
     )
 
 def create_judge_chain(
@@ -1,6 +1,8 @@
-from fastapi import FastAPI, UploadFile
+from fastapi import FastAPI, UploadFile, HTTPException
 from rubric.rubric_to_json import rubric_to_json
 from voice.chatbot import chat_loop
+from grader.video_analysis import jobs, new_job, run_analysis_job
+import asyncio
 import json
 from judges.evaluation import EnhancedEvaluator
 from dotenv import load_dotenv
@@ -39,16 +41,65 @@ async def upload_info(rubric: UploadFile, sponsor_list: list[str]):
     with open("sponsor_list.json", "w") as f:
         f.write(json.dumps(sponsor_list))
 
-# # upload pitch video
-# @app.post("/upload_pitch")
-# async def upload_pitch(pitch: UploadFile):
-#     # TODO: process video for transcript and stats
-#     transcript = None
-#     stats = None
-#     return {
-#         "transcript": transcript,
-#         "stats": stats
-#     }
+# upload pitch video
+UPLOAD_DIR = "uploads"
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Finished jobs stay pollable this long, then are forgotten
+JOB_RETENTION_SECONDS = 3600
+
+# Running analysis tasks; holding them here keeps them from being garbage-collected
+analysis_tasks = set()
+
+async def analyse_upload(job):
+    try:
+        await run_analysis_job(job)
+    finally:
+        try:
+            os.remove(job.video_path)
+        except OSError:
+            pass
+    await asyncio.sleep(JOB_RETENTION_SECONDS)
+    jobs.pop(job.job_id, None)
+
+@app.post("/upload_pitch", status_code=202)
+async def upload_pitch(pitch: UploadFile):
+    """
+    upload_pitch: upload a recorded pitch video for offline analysis
+
+    the video is streamed to disk in chunks, then analysed in the background:
+    emotion detection is sharded across a process pool while the audio track is transcribed.
+    poll /upload_pitch/{job_id} for progress and the transcript and stats when done.
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    job = new_job(video_path="")
+    ext = os.path.splitext(pitch.filename or "")[1] or ".mp4"
+    job.video_path = os.path.join(UPLOAD_DIR, f"{job.job_id}{ext}")
+
+    with open(job.video_path, "wb") as f:
+        while chunk := await pitch.read(UPLOAD_CHUNK_SIZE):
+            await asyncio.to_thread(f.write, chunk)
+
+    task = asyncio.create_task(analyse_upload(job))
+    analysis_tasks.add(task)
+    task.add_done_callback(analysis_tasks.discard)
+    return {"job_id": job.job_id}
+
+@app.get("/upload_pitch/{job_id}")
+async def upload_pitch_status(job_id: str):
+    """
+    upload_pitch_status: progress of an uploaded pitch analysis
+
+    returns the job's progress, plus "transcript", "words" (word timestamps) and "stats" once it is done.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    out = job.progress()
+    if job.result:
+        out["transcript"] = job.result["transcript"]
+        out["words"] = job.result["words"]
+        out["stats"] = {k: v for k, v in job.result.items() if k not in ("transcript", "words")}
+    return out
 
 # start live pitch
 @app.get("/live_pitch")
@@ -0,0 +1,142 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+# -------------------------------------------------
+# Stable-prefix prompts
+# -------------------------------------------------
+# OpenAI caches the longest previously seen prefix of a prompt (from
+# PREFIX_CACHE_MIN_TOKENS tokens up, in PREFIX_CACHE_STEP increments), so
+# prompts that reuse a static opening get cheaper, faster input. Prompt
+# builders therefore put everything fixed for a persona or rubric first, as
+# one byte-stable string, and per-request content last. Each prompt's static
+# prefix is counted once when it is first built. Every call records the
+# tokens of its variable tail, and of the start of the tail that stays the
+# same across a session's calls (the pinned pitch in Q&A history), so
+# /prompt_stats can report input tokens per call and how much of them a
+# prefix cache could serve.
+
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_STEP = 128
+
+_encoding = None
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for the gpt-4o family; about four characters each if tiktoken can't load."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+        except Exception:
+            _encoding = False
+    if _encoding is False:
+        return len(text) // 4 + 1
+    return len(_encoding.encode(text))
+
+
+def cacheable_tokens(prefix_tokens: int) -> int:
+    """Tokens of a static prefix a provider cache could serve once it has been seen."""
+    if prefix_tokens < PREFIX_CACHE_MIN_TOKENS:
+        return 0
+    return prefix_tokens - prefix_tokens % PREFIX_CACHE_STEP
+
+
+@dataclass
+class PromptLayout:
+    name: str
+    prefix: str
+    prefix_tokens: int
+    tail: str
+    session_prefix: Optional[Callable[[Dict[str, Any]], str]] = None
+    calls: int = 0
+    input_tokens: int = 0
+    tail_tokens: int = 0
+    session_prefix_tokens: int = 0
+    cacheable_tokens: int = 0
+    session_cacheable_tokens: int = 0
+
+
+class PromptAccounting:
+    """Static prefix sizes per prompt, and input tokens per call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.layouts: Dict[str, PromptLayout] = {}
+
+    def register(
+        self,
+        name: str,
+        prefix: str,
+        tail: str,
+        session_prefix: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ) -> PromptLayout:
+        """The layout for name; rebuilding an unchanged prompt keeps its counters."""
+        with self._lock:
+            layout = self.layouts.get(name)
+            if layout is not None and layout.prefix == prefix and layout.tail == tail:
+                layout.session_prefix = session_prefix
+                return layout
+        layout = PromptLayout(name, prefix, count_tokens(prefix), tail, session_prefix)
+        with self._lock:
+            self.layouts[name] = layout
+        return layout
+
+    def record(self, name: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        layout = self.layouts[name]
+        tail_tokens = count_tokens(layout.tail.format(**inputs))
+        session_tokens = count_tokens(layout.session_prefix(inputs)) if layout.session_prefix else 0
+        total = layout.prefix_tokens + tail_tokens
+        with self._lock:
+            layout.calls += 1
+            layout.tail_tokens += tail_tokens
+            layout.input_tokens += total
+            layout.session_prefix_tokens += session_tokens
+            layout.cacheable_tokens += cacheable_tokens(layout.prefix_tokens)
+            layout.session_cacheable_tokens += cacheable_tokens(layout.prefix_tokens + session_tokens)
+        return inputs
+
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for name, layout in list(self.layouts.items()):
+            out[name] = {
+                "prefix_tokens": layout.prefix_tokens,
+                "cacheable_prefix_tokens": cacheable_tokens(layout.prefix_tokens),
+                "calls": layout.calls,
+                "avg_input_tokens": (layout.input_tokens / layout.calls) if layout.calls else 0.0,
+                "avg_tail_tokens": (layout.tail_tokens / layout.calls) if layout.calls else 0.0,
+                "avg_session_prefix_tokens": (layout.session_prefix_tokens / layout.calls) if layout.calls else 0.0,
+                "cacheable_fraction": (layout.cacheable_tokens / layout.input_tokens) if layout.input_tokens else 0.0,
+                # Upper bound: assumes an earlier call of the same session was cached
+                "session_cacheable_fraction": (layout.session_cacheable_tokens / layout.input_tokens) if layout.input_tokens else 0.0,
+            }
+        return out
+
+
+prompt_accounting = PromptAccounting()
+
+
+def escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def stable_prompt(
+    name: str,
+    prefix: str,
+    tail: str,
+    input_variables: List[str],
+    session_prefix: Optional[Callable[[Dict[str, Any]], str]] = None,
+):
+    """
+    Prompt whose text is the literal prefix followed by the tail template.
+    session_prefix(inputs), if given, returns the start of the formatted
+    tail that repeats across one session's calls. Returns a runnable that
+    records each call's token counts before formatting, so it can be piped
+    into an LLM like a PromptTemplate.
+    """
+    prompt_accounting.register(name, prefix, tail, session_prefix)
+    prompt = PromptTemplate(input_variables=input_variables, template=escape_braces(prefix) + tail)
+    return RunnableLambda(lambda inputs: prompt_accounting.record(name, inputs)) | prompt
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_community.chat_message_histories import ChatMessageHistory
+
+from vision.broadcaster import CameraBroadcaster
+from vision.emotion_timeline import EmotionTimeline
+from voice.capture import CaptureService
+from voice.history import PromptHistory
+from voice.output import AudioOutput
+from voice.question_bank import QuestionBank
+from voice.speculation import SpeculativeTurn
+from voice.streaming import StreamingTranscriber
+from voice.tts_pipeline import PlaybackScheduler
+
+# -------------------------------------------------
+# Per-session state
+# -------------------------------------------------
+# Everything one pitch rehearsal needs lives on a PitchSession, looked up by
+# the session_id every endpoint and websocket takes. Clients that don't pass
+# one share DEFAULT_SESSION_ID, which matches the old single-pitch behaviour.
+
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when a new session would exceed SessionRegistry.max_sessions."""
+
+
+@dataclass
+class PitchSession:
+    session_id: str
+
+    # Emotion detection
+    emotion_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    total_frames: int = 0
+    emotion_data: Optional[Dict[str, float]] = None
+    emotion_timeline: EmotionTimeline = field(default_factory=EmotionTimeline)
+    video: Optional[CameraBroadcaster] = None
+
+    # Chat / Q&A
+    chat_history: ChatMessageHistory = field(default_factory=ChatMessageHistory)
+    transcript_messages: List[tuple] = field(default_factory=list)
+    chat_active: bool = False
+    qna_mode: bool = False
+    force_audio_stop: bool = False
+    qna_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pitch_captured_event: asyncio.Event = field(default_factory=asyncio.Event)
+    transcript_websockets: List[Any] = field(default_factory=list)
+    microphone: Optional[CaptureService] = None
+    pitch_transcriber: Optional[StreamingTranscriber] = None
+    pitch_ended: bool = False       # end_pitch() was called, possibly before capture got going
+    speculation: Optional[SpeculativeTurn] = None
+    user_turns: int = 0             # Q&A answers taken so far, to spot stale pause cues
+    question_bank: Optional[QuestionBank] = None
+    prompt_history: Optional[PromptHistory] = None
+    playback: Optional[PlaybackScheduler] = None
+    audio_output: Optional[AudioOutput] = None
+    tasks: set = field(default_factory=set)
+
+    created_at: float = field(default_factory=time.monotonic)
+    last_active: float = field(default_factory=time.monotonic)
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        """True while any websocket is attached to this session."""
+        return bool(self.transcript_websockets) or (self.video is not None and self.video.running)
+
+    def spawn(self, coro) -> asyncio.Task:
+        """Run coro as a task owned by this session, cancelled on close()."""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def reset_chat(self):
+        self.chat_active = True
+        self.qna_mode = False
+        self.chat_history = ChatMessageHistory()
+        if self.prompt_history is not None:
+            self.prompt_history.cancel()
+            self.prompt_history = None
+        self.transcript_messages = []
+        self.force_audio_stop = False
+        self.pitch_ended = False
+        self.pitch_captured_event.clear()
+        # Questions drafted for an earlier pitch don't apply to the next one
+        if self.question_bank is not None:
+            self.question_bank.cancel()
+            self.question_bank = None
+
+    def reset_emotion_data(self):
+        self.emotion_counts.clear()
+        self.total_frames = 0
+        self.emotion_timeline.reset()
+
+    def record_emotion(self, emotions: Dict[str, float]):
+        dom_emotion = max(emotions.items(), key=lambda x: x[1])[0]
+        self.emotion_counts[dom_emotion] += 1
+        self.total_frames += 1
+        self.emotion_timeline.add(emotions)
+
+    def save_emotion_data(self, threshold: float = 5.0, path: str = "emotion_data.json"):
+        if self.total_frames > 0:
+            perc = {k: (v / self.total_frames * 100) for k, v in self.emotion_counts.items()}
+            fil = {k: v for k, v in perc.items() if v >= threshold}
+            self.emotion_data = dict(sorted(fil.items(), key=lambda x: x[1], reverse=True))
+            with open(path, "w") as f:
+                json.dump(self.emotion_data, f, indent=4)
+            print(f"Saved {path} for session {self.session_id}")
+
+    async def audio_input(self) -> CaptureService:
+        """The session's microphone, opened on first use and kept open until close()."""
+        if self.microphone is None or not self.microphone.running:
+            self.microphone = CaptureService()
+            await self.microphone.start()
+        return self.microphone
+
+    def end_pitch(self):
+        """Stop a continuous pitch capture; its final transcript follows shortly."""
+        self.pitch_ended = True
+        if self.pitch_transcriber is not None:
+            self.pitch_transcriber.stop()
+
+    def cancel_speculation(self):
+        if self.speculation is not None:
+            self.speculation.cancel()
+            self.speculation = None
+
+    async def close(self):
+        self.chat_active = False
+        self.qna_mode = False
+        self.force_audio_stop = True
+        self.end_pitch()
+        self.cancel_speculation()
+        if self.question_bank is not None:
+            self.question_bank.cancel()
+        if self.prompt_history is not None:
+            self.prompt_history.cancel()
+        self.pitch_captured_event.set()
+        if self.video is not None:
+            self.video.stop()
+        if self.microphone is not None:
+            self.microphone.stop()
+        if self.playback is not None:
+            self.playback.close()
+        if self.audio_output is not None:
+            self.audio_output.close()
+        for task in list(self.tasks):
+            task.cancel()
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "session_id": self.session_id,
+            "chat_active": self.chat_active,
+            "qna_mode": self.qna_mode,
+            "connected": self.connected,
+            "messages": len(self.transcript_messages),
+            "age_s": now - self.created_at,
+            "idle_s": now - self.last_active,
+            "microphone": self.microphone.stats() if self.microphone is not None else None,
+            "playback": self.playback.stats() if self.playback is not None else None,
+            "audio_output": self.audio_output.stats() if self.audio_output is not None else None,
+            "question_bank": self.question_bank.stats() if self.question_bank is not None else None,
+            "prompt_history": self.prompt_history.stats() if self.prompt_history is not None else None,
+        }
+
+
+class SessionRegistry:
+    """
+    PitchSessions keyed by session id. Sessions with no attached websockets
+    that haven't been touched for idle_timeout seconds are evicted.
+    """
+
+    def __init__(self, idle_timeout: float = 1800.0, max_sessions: int = 256):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, PitchSession] = {}
+        self._evictor: Optional[asyncio.Task] = None
+
+    def get(self, session_id: str = DEFAULT_SESSION_ID) -> PitchSession:
+        """Return the session, creating it on first use."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f"Session limit of {self.max_sessions} reached")
+            session = PitchSession(session_id)
+            self._sessions[session_id] = session
+        session.touch()
+        return session
+
+    def find(self, session_id: str) -> Optional[PitchSession]:
+        return self._sessions.get(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    async def evict_idle(self) -> List[str]:
+        now = time.monotonic()
+        evicted = []
+        for session_id, session in list(self._sessions.items()):
+            if not session.connected and now - session.last_active > self.idle_timeout:
+                await session.close()
+                del self._sessions[session_id]
+                evicted.append(session_id)
+        if evicted:
+            print(f"Evicted idle sessions: {', '.join(evicted)}")
+        return evicted
+
+    async def _evict_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    def start_eviction(self, interval: float = 60.0):
+        if self._evictor is None or self._evictor.done():
+            self._evictor = asyncio.create_task(self._evict_loop(interval))
+
+    async def close(self):
+        if self._evictor is not None:
+            self._evictor.cancel()
+        for session in list(self._sessions.values()):
+            await session.close()
+        self._sessions.clear()
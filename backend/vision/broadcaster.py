@@ -0,0 +1,93 @@
+import asyncio
+from typing import Callable, Dict, Optional
+
+from vision.emotion_service import EmotionInferenceService
+from vision.pipeline import VideoPipeline
+from vision.stream import ClientStream
+
+# -------------------------------------------------
+# One producer per camera, many viewers
+# -------------------------------------------------
+# The first subscriber opens the camera and starts a VideoPipeline; later
+# subscribers (a coach dashboard, a second tab) just join its fan-out list.
+# The pipeline stops when the last subscriber leaves or stop() is called.
+
+
+class CameraBroadcaster:
+    """
+    Owns the VideoPipeline for one camera. on_start runs before a fresh
+    pipeline starts producing, on_stop after it has finished.
+    """
+
+    def __init__(
+        self,
+        emotion_service: EmotionInferenceService,
+        source: int = 0,
+        on_emotion: Optional[Callable[[Dict[str, float]], None]] = None,
+        on_start: Optional[Callable[[], None]] = None,
+        on_stop: Optional[Callable[[], None]] = None,
+    ):
+        self.emotion_service = emotion_service
+        self.source = source
+        self.on_emotion = on_emotion
+        self.on_start = on_start
+        self.on_stop = on_stop
+        self.pipeline: Optional[VideoPipeline] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _ensure_started(self) -> bool:
+        async with self._lock:
+            if self.running:
+                if not self.pipeline.stopping:
+                    return True
+                # The last viewer just left; let that pipeline wind down first
+                await self._task
+            pipeline = VideoPipeline(self.emotion_service, self.source, on_emotion=self.on_emotion)
+            if not await asyncio.to_thread(pipeline.open):
+                return False
+            if self.on_start:
+                self.on_start()
+            self.pipeline = pipeline
+            self._task = asyncio.create_task(self._produce(pipeline))
+            return True
+
+    async def _produce(self, pipeline: VideoPipeline):
+        try:
+            await pipeline.run()
+        except Exception as e:
+            print(f"Video pipeline error: {e}")
+        finally:
+            if self.on_stop:
+                self.on_stop()
+
+    async def serve(self, client: ClientStream) -> bool:
+        """
+        Stream to client until it disconnects or the camera stops.
+        Returns False if the camera could not be opened.
+        """
+        if not await self._ensure_started():
+            return False
+        pipeline = self.pipeline
+        pipeline.clients.append(client)
+        try:
+            await client.run()
+        finally:
+            if client in pipeline.clients:
+                pipeline.clients.remove(client)
+            if not pipeline.clients:
+                pipeline.stop()
+        return True
+
+    def stop(self):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    def stats(self) -> Dict:
+        if self.pipeline is None:
+            return {}
+        return self.pipeline.stats()
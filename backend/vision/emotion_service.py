@@ -0,0 +1,155 @@
+import asyncio
+import time
+import concurrent.futures
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+from deepface import DeepFace
+
+# -------------------------------------------------
+# Batched DeepFace emotion inference
+# -------------------------------------------------
+# DeepFace.analyze is a blocking TensorFlow call. Running it inline in a
+# websocket coroutine stalls every other coroutine in the process, so all
+# classification goes through this service instead: face ROIs from every
+# stream are queued, grouped into batches and classified on worker threads.
+
+
+def _classify_one(roi: np.ndarray) -> Optional[Dict[str, float]]:
+    try:
+        result = DeepFace.analyze(roi, actions=["emotion"], enforce_detection=False, silent=True)
+        return {k: float(v) for k, v in result[0]["emotion"].items()}
+    except Exception as e:
+        print(f"Emotion analysis error: {e}")
+        return None
+
+
+class EmotionInferenceService:
+    """
+    Collects face ROIs from all streams into batched DeepFace calls that run
+    on a thread pool, and resolves each caller's future with its result.
+    """
+
+    def __init__(self, max_batch_size: int = 16, max_wait_ms: float = 10.0, workers: int = 1):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.workers = workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="emotion"
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._batchers: List[asyncio.Task] = []
+        # None until the first multi-face batch tells us whether the installed
+        # DeepFace accepts a list of images in one analyze() call
+        self._batch_supported: Optional[bool] = None
+
+        # (batch_size, latency_s, queue_wait_s) for the most recent batches
+        self._recent = deque(maxlen=500)
+        self._total_batches = 0
+        self._total_faces = 0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._batchers = [
+                asyncio.create_task(self._batch_loop()) for _ in range(self.workers)
+            ]
+
+    async def analyze(self, rois: List[np.ndarray]) -> List[Optional[Dict[str, float]]]:
+        """
+        Classify a list of face ROIs. Returns one emotion->score dict per ROI,
+        or None for an ROI whose analysis failed.
+        """
+        if not rois:
+            return []
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for roi in rois:
+            fut = loop.create_future()
+            self._queue.put_nowait((roi, fut, time.perf_counter()))
+            futures.append(fut)
+        return await asyncio.gather(*futures)
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            rois = [item[0] for item in batch]
+            started = time.perf_counter()
+            queue_wait = sum(started - item[2] for item in batch) / len(batch)
+            try:
+                results = await loop.run_in_executor(self._executor, self._classify_batch, rois)
+            except Exception as e:
+                print(f"Emotion batch error: {e}")
+                results = [None] * len(batch)
+            latency = time.perf_counter() - started
+
+            self._recent.append((len(batch), latency, queue_wait))
+            self._total_batches += 1
+            self._total_faces += len(batch)
+
+            for (_, fut, _), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+
+    def _classify_batch(self, rois: List[np.ndarray]) -> List[Optional[Dict[str, float]]]:
+        if len(rois) > 1 and self._batch_supported is not False:
+            try:
+                results = DeepFace.analyze(rois, actions=["emotion"], enforce_detection=False, silent=True)
+                # Batched analyze returns one list of face results per input image
+                if len(results) == len(rois) and all(isinstance(r, list) for r in results):
+                    self._batch_supported = True
+                    return [{k: float(v) for k, v in r[0]["emotion"].items()} for r in results]
+                self._batch_supported = False
+            except Exception:
+                # Older DeepFace releases only take a single image
+                self._batch_supported = False
+        return [_classify_one(roi) for roi in rois]
+
+    def stats(self) -> Dict[str, float]:
+        """Per-batch size and latency figures over the recent window."""
+        if not self._recent:
+            return {
+                "total_batches": self._total_batches,
+                "total_faces": self._total_faces,
+                "queue_depth": self._queue.qsize() if self._queue else 0,
+            }
+        sizes = np.array([r[0] for r in self._recent])
+        latencies = np.array([r[1] for r in self._recent]) * 1000.0
+        waits = np.array([r[2] for r in self._recent]) * 1000.0
+        return {
+            "total_batches": self._total_batches,
+            "total_faces": self._total_faces,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": float(sizes.mean()),
+            "max_batch_size": int(sizes.max()),
+            "avg_latency_ms": float(latencies.mean()),
+            "p95_latency_ms": float(np.percentile(latencies, 95)),
+            "avg_latency_per_face_ms": float(latencies.sum() / sizes.sum()),
+            "avg_queue_wait_ms": float(waits.mean()),
+            "batched_calls_supported": bool(self._batch_supported),
+        }
+
+    async def close(self):
+        for task in self._batchers:
+            task.cancel()
+        self._batchers = []
+        self._queue = None
+        self._executor.shutdown(wait=False)
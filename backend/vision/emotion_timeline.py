@@ -0,0 +1,127 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# -------------------------------------------------
+# Emotion timeline
+# -------------------------------------------------
+# Full DeepFace emotion vectors over the whole pitch, in time buckets.
+# Each closed bucket is one row of quantized uint8 scores (0-255 for
+# 0-100%) plus a sample count, in a fixed-size array. When the pitch outlasts
+# the array, adjacent buckets are merged pairwise and the bucket width doubles,
+# so memory stays constant however long the pitch runs.
+
+EMOTIONS = ("angry", "disgust", "fear", "happy", "sad", "surprise", "neutral")
+_QUANT = 255.0 / 100.0
+
+
+class EmotionTimeline:
+    """Bucketed emotion probability vectors with windowed mix queries."""
+
+    def __init__(self, capacity: int = 3600, bucket_seconds: float = 1.0):
+        self.capacity = capacity
+        self.base_bucket_seconds = bucket_seconds
+        self.reset()
+
+    def reset(self):
+        self.bucket_seconds = self.base_bucket_seconds
+        self._scores = np.zeros((self.capacity, len(EMOTIONS)), dtype=np.uint8)
+        self._counts = np.zeros(self.capacity, dtype=np.uint32)
+        self._length = 0             # buckets in use, including the open one
+        self._open_sum = np.zeros(len(EMOTIONS), dtype=np.float64)
+        self._open_count = 0
+        self._origin: Optional[float] = None
+
+    def _vector(self, emotions: Dict[str, float]) -> np.ndarray:
+        return np.array([emotions.get(e, 0.0) for e in EMOTIONS], dtype=np.float64)
+
+    def _flush_open(self):
+        if self._open_count and self._length:
+            mean = self._open_sum / self._open_count
+            self._scores[self._length - 1] = np.clip(np.rint(mean * _QUANT), 0, 255)
+            self._counts[self._length - 1] = self._open_count
+
+    def _downsample(self):
+        """Merge bucket pairs, halving resolution and freeing half the array."""
+        self._flush_open()
+        n = self._length
+        if not n:
+            # Nothing recorded yet (first sample is past the end); just widen buckets
+            self.bucket_seconds *= 2
+            return
+        pairs = (n + 1) // 2
+        scores = self._scores[:n].astype(np.float64)
+        counts = self._counts[:n].astype(np.float64)
+        if n % 2:
+            scores = np.vstack([scores, np.zeros((1, scores.shape[1]))])
+            counts = np.append(counts, 0.0)
+        scores = scores.reshape(pairs, 2, -1)
+        counts = counts.reshape(pairs, 2)
+        merged_counts = counts.sum(axis=1)
+        weights = np.where(merged_counts > 0, merged_counts, 1.0)
+        merged = (scores * counts[:, :, None]).sum(axis=1) / weights[:, None]
+
+        self._scores[:] = 0
+        self._counts[:] = 0
+        self._scores[:pairs] = np.rint(merged).astype(np.uint8)
+        self._counts[:pairs] = merged_counts.astype(np.uint32)
+        self._length = pairs
+        self.bucket_seconds *= 2
+        # The last merged bucket becomes the open one again
+        self._open_count = int(merged_counts[-1])
+        self._open_sum = merged[-1] / _QUANT * self._open_count
+
+    def add(self, emotions: Dict[str, float], t: Optional[float] = None):
+        """Add one sample; t is seconds since the first sample (defaults to now)."""
+        if t is None:
+            now = time.monotonic()
+            if self._origin is None:
+                self._origin = now
+            t = now - self._origin
+        idx = int(t // self.bucket_seconds)
+        while idx >= self.capacity:
+            self._downsample()
+            idx = int(t // self.bucket_seconds)
+
+        if idx + 1 != self._length:
+            if idx + 1 < self._length:
+                idx = self._length - 1  # late sample; fold into the open bucket
+            else:
+                self._flush_open()
+                self._length = idx + 1
+                self._open_sum = np.zeros(len(EMOTIONS), dtype=np.float64)
+                self._open_count = 0
+        self._open_sum += self._vector(emotions)
+        self._open_count += 1
+
+    @property
+    def duration(self) -> float:
+        return self._length * self.bucket_seconds
+
+    def mix(self, start: float = 0.0, end: Optional[float] = None) -> Dict[str, float]:
+        """Average emotion percentages over [start, end) seconds of the pitch."""
+        self._flush_open()
+        if not self._length:
+            return {}
+        end = self.duration if end is None else end
+        i0 = max(0, int(start // self.bucket_seconds))
+        i1 = min(self._length, int(np.ceil(end / self.bucket_seconds)))
+        if i1 <= i0:
+            return {}
+        counts = self._counts[i0:i1].astype(np.float64)
+        total = counts.sum()
+        if not total:
+            return {}
+        mean = (self._scores[i0:i1].astype(np.float64) * counts[:, None]).sum(axis=0) / total / _QUANT
+        return {e: float(v) for e, v in zip(EMOTIONS, mean)}
+
+    def series(self, resolution: float = 60.0) -> List[Dict[str, float]]:
+        """Emotion mix for each consecutive window of resolution seconds (at least one bucket)."""
+        resolution = max(resolution, self.bucket_seconds)
+        windows = int(np.ceil(self.duration / resolution)) if self._length else 0
+        return [self.mix(i * resolution, (i + 1) * resolution) for i in range(windows)]
+
+    @property
+    def nbytes(self) -> int:
+        return self._scores.nbytes + self._counts.nbytes
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Tuple
+
+Box = Tuple[int, int, int, int]
+
+# -------------------------------------------------
+# Detection + tracking
+# -------------------------------------------------
+# Running the Haar cascade on every full-resolution frame is most of the
+# per-frame CPU. The tracker runs it on a downscaled frame every few frames
+# only, and follows each face in between by template matching in a small
+# search window around its last position.
+
+
+class FaceTracker:
+    """
+    Returns face boxes (x, y, w, h) in full-frame coordinates for each
+    grayscale frame passed to update().
+
+    The detector runs on a frame downscaled to detect_width every detect_every
+    frames, or on the next frame whenever a face's match score falls below
+    min_confidence.
+    """
+
+    def __init__(
+        self,
+        detect_every: int = 10,
+        detect_width: int = 320,
+        min_confidence: float = 0.6,
+        search_margin: float = 0.5,
+        min_face_size: int = 30,
+    ):
+        self.detect_every = detect_every
+        self.detect_width = detect_width
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.min_face_size = min_face_size
+        self.face_cascade = cv2.CascadeClassifier(
+            cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        )
+
+        self.confidence = 0.0
+        self._frames_since_detect = detect_every  # detect on the first frame
+        self._scale = 1.0
+        self._faces: List[Box] = []          # in downscaled coordinates
+        self._templates: List[np.ndarray] = []
+        self._detections = 0
+        self._tracked_frames = 0
+
+    def _downscale(self, gray: np.ndarray) -> np.ndarray:
+        h, w = gray.shape[:2]
+        self._scale = min(1.0, self.detect_width / float(w))
+        if self._scale == 1.0:
+            return gray
+        return cv2.resize(gray, (int(w * self._scale), int(h * self._scale)), interpolation=cv2.INTER_AREA)
+
+    def _detect(self, small: np.ndarray):
+        # The cascade's base window is 24x24, so never ask for smaller faces
+        min_size = max(24, int(self.min_face_size * self._scale))
+        faces = self.face_cascade.detectMultiScale(small, 1.1, 5, minSize=(min_size, min_size))
+        # Largest face first so index 0 stays the presenter
+        self._faces = sorted((tuple(int(v) for v in f) for f in faces), key=lambda f: f[2] * f[3], reverse=True)
+        self._templates = [small[y:y+h, x:x+w].copy() for (x, y, w, h) in self._faces]
+        self.confidence = 1.0 if self._faces else 0.0
+        self._frames_since_detect = 0
+        self._detections += 1
+
+    def _track(self, small: np.ndarray) -> bool:
+        """Move each face to its best match nearby. False if any match is weak."""
+        fh, fw = small.shape[:2]
+        tracked = []
+        confidence = 1.0
+        for (x, y, w, h), template in zip(self._faces, self._templates):
+            mx, my = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(0, x - mx), max(0, y - my)
+            x1, y1 = min(fw, x + w + mx), min(fh, y + h + my)
+            window = small[y0:y1, x0:x1]
+            if window.shape[0] < h or window.shape[1] < w:
+                return False
+            scores = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, best, _, (bx, by) = cv2.minMaxLoc(scores)
+            confidence = min(confidence, best)
+            tracked.append((x0 + bx, y0 + by, w, h))
+        self.confidence = confidence
+        if confidence < self.min_confidence:
+            return False
+        self._faces = tracked
+        self._tracked_frames += 1
+        return True
+
+    def update(self, gray: np.ndarray) -> List[Box]:
+        small = self._downscale(gray)
+        self._frames_since_detect += 1
+        if self._frames_since_detect >= self.detect_every or (
+            self._faces and not self._track(small)
+        ):
+            self._detect(small)
+
+        inv = 1.0 / self._scale
+        return [
+            (int(x * inv), int(y * inv), int(w * inv), int(h * inv))
+            for (x, y, w, h) in self._faces
+        ]
+
+    def stats(self) -> Dict[str, float]:
+        total = self._detections + self._tracked_frames
+        return {
+            "detections": self._detections,
+            "tracked_frames": self._tracked_frames,
+            "detect_ratio": (self._detections / total) if total else 0.0,
+            "confidence": float(self.confidence),
+        }
@@ -0,0 +1,229 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from vision.emotion_service import EmotionInferenceService
+from vision.face_tracker import FaceTracker
+from vision.queues import DropQueue, StageStats
+from vision.sampler import AdaptiveEmotionSampler
+from vision.stream import ClientStream, encode_jpeg, frame_thumbnail
+
+# -------------------------------------------------
+# Staged video pipeline
+# -------------------------------------------------
+# capture (thread) -> detect -> classify -> encode -> send (vision.stream)
+#
+# One pipeline serves any number of subscribed clients. Each annotated frame
+# is encoded once per quality setting in use and the same bytes are queued
+# to every client on that setting.
+#
+# Stages are joined by one-slot queues that overwrite the waiting frame when
+# a new one arrives, so a slow stage skips frames instead of building a
+# backlog. Classification runs beside the frame flow rather than in it: frames
+# carry the most recent labels forward while the next sample is in flight.
+
+
+@dataclass
+class Frame:
+    image: np.ndarray
+    captured_at: float
+    faces: List[Tuple[int, int, int, int]] = field(default_factory=list)
+    labels: List[Optional[str]] = field(default_factory=list)
+    jpeg: Optional[bytes] = None
+
+
+class VideoPipeline:
+    """
+    Annotated webcam stream with emotion labels, fanned out to self.clients.
+    on_emotion, if given, is called with the presenter's raw emotion scores
+    on every sample.
+    """
+
+    STAGES = ("capture", "detect", "classify", "encode")
+
+    def __init__(
+        self,
+        emotion_service: EmotionInferenceService,
+        source: int = 0,
+        on_emotion: Optional[Callable[[Dict[str, float]], None]] = None,
+    ):
+        self.emotion_service = emotion_service
+        self.source = source
+        self.on_emotion = on_emotion
+        self.tracker = FaceTracker()
+        self.sampler = AdaptiveEmotionSampler()
+        self.stages = {name: StageStats() for name in self.STAGES}
+        self.clients: List[ClientStream] = []
+        self.encodes = 0
+        self.deliveries = 0
+
+        self._capture = None
+        self._stop_event = threading.Event()
+        self._queues: Dict[str, DropQueue] = {}
+        self._labels: List[Optional[str]] = []
+        self._inflight: Optional[asyncio.Task] = None
+
+    def open(self) -> bool:
+        """Open the camera. Blocking; call from a worker thread."""
+        self._capture = cv2.VideoCapture(self.source)
+        return self._capture.isOpened()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    async def run(self):
+        """Produce frames for subscribed clients until stopped or the camera ends."""
+        loop = asyncio.get_running_loop()
+        self._queues = {name: DropQueue() for name in self.STAGES[1:]}
+        capture_thread = threading.Thread(target=self._capture_loop, args=(loop,), daemon=True)
+        capture_thread.start()
+
+        tasks = [
+            asyncio.create_task(self._detect_stage()),
+            asyncio.create_task(self._classify_stage()),
+            asyncio.create_task(self._encode_stage()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            self.stop()
+            for task in tasks:
+                task.cancel()
+            if self._inflight:
+                self._inflight.cancel()
+            await asyncio.to_thread(capture_thread.join)
+            for client in self.clients:
+                client.offer(None)
+
+    # ---------- stages ----------
+
+    def _capture_loop(self, loop: asyncio.AbstractEventLoop):
+        try:
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                ret, image = self._capture.read()
+                if not ret:
+                    break
+                now = time.perf_counter()
+                self.stages["capture"].record(now - started)
+                loop.call_soon_threadsafe(self._queues["detect"].put, Frame(image, now))
+        finally:
+            self._capture.release()
+            try:
+                loop.call_soon_threadsafe(self._queues["detect"].put, None)
+            except RuntimeError:
+                pass  # event loop already closed
+
+    def _detect(self, item: Frame):
+        gray = cv2.cvtColor(item.image, cv2.COLOR_BGR2GRAY)
+        item.faces = self.tracker.update(gray)
+
+    async def _detect_stage(self):
+        while True:
+            item = await self._queues["detect"].get()
+            if item is None:
+                self._queues["classify"].put(None)
+                return
+            started = time.perf_counter()
+            await asyncio.to_thread(self._detect, item)
+            self.stages["detect"].record(time.perf_counter() - started)
+            self._queues["classify"].put(item)
+
+    async def _classify_stage(self):
+        while True:
+            item = await self._queues["classify"].get()
+            if item is None:
+                self._queues["encode"].put(None)
+                return
+            if not item.faces:
+                self._labels = []
+                self.sampler.reset_smoothing()
+            elif self._inflight is None and self.sampler.should_sample():
+                # Copy ROIs; the encode stage draws on the frame in place
+                rois = [item.image[y:y+h, x:x+w].copy() for (x, y, w, h) in item.faces]
+                self._inflight = asyncio.create_task(self._classify(rois))
+            item.labels = self._labels
+            self._queues["encode"].put(item)
+
+    async def _classify(self, rois: List[np.ndarray]):
+        started = time.perf_counter()
+        try:
+            results = await self.emotion_service.analyze(rois)
+            labels = []
+            for i, emotions in enumerate(results):
+                if not emotions:
+                    labels.append(None)
+                    continue
+                # The first face is the presenter; only it feeds the pitch stats
+                if i == 0:
+                    if self.on_emotion:
+                        self.on_emotion(emotions)
+                    emotions = self.sampler.smooth(emotions)
+                labels.append(max(emotions.items(), key=lambda x: x[1])[0])
+            self._labels = labels
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sampler.record_latency(elapsed)
+            self.stages["classify"].record(elapsed)
+            self._inflight = None
+
+    def _encode(self, item: Frame, clients: List[ClientStream]) -> List[Tuple[ClientStream, bytes]]:
+        for (x, y, w, h), label in zip(item.faces, item.labels):
+            if not label:
+                continue
+            cv2.rectangle(item.image, (x,y), (x+w,y+h), (0,255,0),2)
+            cv2.putText(item.image, label, (x,y-10),
+                        cv2.FONT_HERSHEY_SIMPLEX,0.9,(0,255,0),2)
+
+        thumb = frame_thumbnail(item.image)
+        encoded: Dict[Tuple[float, int], bytes] = {}
+        deliveries = []
+        for client in clients:
+            if not client.wants(thumb):
+                continue
+            setting = client.setting
+            if setting not in encoded:
+                encoded[setting] = encode_jpeg(item.image, *setting)
+            deliveries.append((client, encoded[setting]))
+        self.encodes += len(encoded)
+        return deliveries
+
+    async def _encode_stage(self):
+        while True:
+            item = await self._queues["encode"].get()
+            if item is None:
+                return
+            if not self.clients:
+                continue
+            started = time.perf_counter()
+            deliveries = await asyncio.to_thread(self._encode, item, list(self.clients))
+            self.stages["encode"].record(time.perf_counter() - started)
+            for client, jpeg in deliveries:
+                client.offer(jpeg, item.captured_at)
+            self.deliveries += len(deliveries)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        out = {
+            name: self.stages[name].summary(self._queues[name].dropped if name in self._queues else 0)
+            for name in self.STAGES
+        }
+        out["fanout"] = {
+            "subscribers": len(self.clients),
+            "encodes": self.encodes,
+            "deliveries": self.deliveries,
+        }
+        out["clients"] = [client.stats() for client in self.clients]
+        out["sampler"] = self.sampler.stats()
+        out["tracker"] = self.tracker.stats()
+        return out
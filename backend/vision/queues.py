@@ -0,0 +1,59 @@
+import asyncio
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+# -------------------------------------------------
+# Queue and timing helpers shared by the video stages
+# -------------------------------------------------
+
+
+class DropQueue:
+    """Bounded single-consumer asyncio queue that discards the oldest item when full."""
+
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, item):
+        if len(self._items) >= self.maxsize:
+            self._items.popleft()
+            self.dropped += 1
+        self._items.append(item)
+        self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+
+class StageStats:
+    """Timing counters for one pipeline stage."""
+
+    def __init__(self, window: int = 200):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def summary(self, dropped: int = 0) -> Dict[str, float]:
+        recent = np.array(self._recent) * 1000.0 if self._recent else np.zeros(1)
+        return {
+            "count": self.count,
+            "dropped": dropped,
+            "avg_ms": (self.total / self.count * 1000.0) if self.count else 0.0,
+            "recent_avg_ms": float(recent.mean()),
+            "recent_p95_ms": float(np.percentile(recent, 95)),
+            "max_ms": self.max * 1000.0,
+        }
@@ -0,0 +1,98 @@
+import os
+import time
+from typing import Dict, Optional
+
+# -------------------------------------------------
+# Adaptive emotion sampling
+# -------------------------------------------------
+# The video stream runs at a fixed frame rate, but emotion analysis only needs
+# a few samples per second. The sampler decides which frames get analysed and
+# backs the analysis rate off when inference gets slow or the host is busy.
+
+
+def _cpu_load() -> float:
+    """1-minute load average per core, or 0.0 where that isn't available."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+class AdaptiveEmotionSampler:
+    """
+    Picks emotion-analysis frames at between min_hz and max_hz, independently
+    of the stream_fps the video is sent at, and smooths results between samples.
+
+    The analysis interval is sized so inference takes at most target_busy of
+    it, and is stretched further while host CPU load exceeds max_cpu_load.
+    """
+
+    def __init__(
+        self,
+        stream_fps: float = 30.0,
+        min_hz: float = 2.0,
+        max_hz: float = 5.0,
+        target_busy: float = 0.5,
+        max_cpu_load: float = 0.8,
+        smoothing: float = 0.4,
+    ):
+        self.frame_interval = 1.0 / stream_fps
+        self.min_interval = 1.0 / max_hz
+        self.max_interval = 1.0 / min_hz
+        self.target_busy = target_busy
+        self.max_cpu_load = max_cpu_load
+        self.smoothing = smoothing
+
+        self.interval = self.min_interval
+        self._last_sample = 0.0
+        self._latency_ema: Optional[float] = None
+        self._cpu = 0.0
+        self._cpu_checked = 0.0
+        self._smoothed: Optional[Dict[str, float]] = None
+
+    def should_sample(self, now: Optional[float] = None) -> bool:
+        now = time.perf_counter() if now is None else now
+        if now - self._last_sample >= self.interval:
+            self._last_sample = now
+            return True
+        return False
+
+    def record_latency(self, seconds: float):
+        """Feed back how long one analysis (detection + classification) took."""
+        if self._latency_ema is None:
+            self._latency_ema = seconds
+        else:
+            self._latency_ema = self._latency_ema * 0.8 + seconds * 0.2
+        self._retune()
+
+    def _retune(self):
+        now = time.perf_counter()
+        if now - self._cpu_checked >= 1.0:
+            self._cpu = _cpu_load()
+            self._cpu_checked = now
+
+        interval = self._latency_ema / self.target_busy
+        if self._cpu > self.max_cpu_load:
+            # Shed load proportionally to how far over budget the host is
+            interval *= self._cpu / self.max_cpu_load
+        self.interval = min(self.max_interval, max(self.min_interval, interval))
+
+    def smooth(self, emotions: Dict[str, float]) -> Dict[str, float]:
+        """Exponentially smooth emotion scores across samples."""
+        if self._smoothed is None:
+            self._smoothed = dict(emotions)
+        else:
+            a = self.smoothing
+            for k, v in emotions.items():
+                self._smoothed[k] = self._smoothed.get(k, v) * (1.0 - a) + v * a
+        return dict(self._smoothed)
+
+    def reset_smoothing(self):
+        self._smoothed = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "sample_hz": 1.0 / self.interval,
+            "latency_ms": (self._latency_ema or 0.0) * 1000.0,
+            "cpu_load": self._cpu,
+        }
@@ -0,0 +1,138 @@
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from vision.queues import DropQueue, StageStats
+
+# -------------------------------------------------
+# Per-client JPEG streaming
+# -------------------------------------------------
+# Each viewer gets its own rung on a quality/resolution ladder, skips frames
+# that barely differ from the last one it was sent, and has a small send
+# queue that drops frames rather than letting a slow browser hold up the
+# pipeline. The rung moves down when the client falls behind and back up
+# after a run of on-time sends.
+
+# (resolution scale, JPEG quality), best first
+LADDERS: Dict[str, List[Tuple[float, int]]] = {
+    "high": [(1.0, 85), (1.0, 70), (0.75, 65), (0.5, 60), (0.5, 45), (0.35, 40)],
+    "medium": [(0.75, 70), (0.75, 60), (0.5, 55), (0.5, 45), (0.35, 40)],
+    "low": [(0.5, 55), (0.5, 45), (0.35, 40), (0.25, 35)],
+}
+
+
+def encode_jpeg(image: np.ndarray, scale: float, quality: int) -> bytes:
+    if scale != 1.0:
+        h, w = image.shape[:2]
+        image = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    _, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes()
+
+
+def frame_thumbnail(image: np.ndarray) -> np.ndarray:
+    """32x24 thumbnail used for near-duplicate checks."""
+    return cv2.resize(image, (32, 24), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class FrameDeduper:
+    """
+    Flags frames whose frame_thumbnail() differs from the last accepted frame by
+    less than threshold (mean absolute difference, 0-255). A frame is always
+    accepted after max_interval seconds so the client still sees a refresh.
+    """
+
+    def __init__(self, threshold: float = 2.0, max_interval: float = 1.0):
+        self.threshold = threshold
+        self.max_interval = max_interval
+        self.skipped = 0
+        self._last: Optional[np.ndarray] = None
+        self._last_accepted = 0.0
+
+    def is_new(self, thumb: np.ndarray, now: Optional[float] = None) -> bool:
+        now = time.perf_counter() if now is None else now
+        if self._last is not None and now - self._last_accepted < self.max_interval:
+            if np.abs(thumb - self._last).mean() < self.threshold:
+                self.skipped += 1
+                return False
+        self._last = thumb
+        self._last_accepted = now
+        return True
+
+
+class ClientStream:
+    """One viewer's send queue, quality rung and dedup state."""
+
+    def __init__(
+        self,
+        send: Callable[[bytes], Awaitable],
+        quality: str = "high",
+        target_fps: float = 30.0,
+        queue_size: int = 2,
+        dedup_threshold: float = 2.0,
+        upgrade_after: int = 60,
+    ):
+        self.send = send
+        self.ladder = LADDERS.get(quality, LADDERS["high"])
+        self.rung = 0
+        self.frame_budget = 1.0 / target_fps
+        self.upgrade_after = upgrade_after
+        self.queue = DropQueue(queue_size)
+        self.deduper = FrameDeduper(dedup_threshold)
+        self.send_stats = StageStats()
+        self.latency = StageStats()
+        self.bytes_sent = 0
+        self._good_streak = 0
+        self._seen_dropped = 0
+
+    @property
+    def setting(self) -> Tuple[float, int]:
+        return self.ladder[self.rung]
+
+    def wants(self, thumb: np.ndarray) -> bool:
+        return self.deduper.is_new(thumb)
+
+    def offer(self, jpeg: Optional[bytes], captured_at: float = 0.0):
+        """Queue a frame for sending; None ends the stream."""
+        self.queue.put(None if jpeg is None else (jpeg, captured_at))
+
+    async def run(self):
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                return
+            jpeg, captured_at = item
+            started = time.perf_counter()
+            await self.send(jpeg)
+            now = time.perf_counter()
+            self.send_stats.record(now - started)
+            self.latency.record(now - captured_at)
+            self.bytes_sent += len(jpeg)
+            self._adapt(now - started)
+
+    def _adapt(self, send_seconds: float):
+        dropped = self.queue.dropped - self._seen_dropped
+        self._seen_dropped = self.queue.dropped
+        if dropped or send_seconds > self.frame_budget:
+            self._good_streak = 0
+            self.rung = min(self.rung + 1, len(self.ladder) - 1)
+            return
+        self._good_streak += 1
+        if self._good_streak >= self.upgrade_after and self.rung > 0:
+            self._good_streak = 0
+            self.rung -= 1
+
+    def stats(self) -> Dict[str, float]:
+        scale, quality = self.setting
+        return {
+            "rung": self.rung,
+            "scale": scale,
+            "quality": quality,
+            "sent": self.send_stats.count,
+            "bytes_sent": self.bytes_sent,
+            "dropped_backpressure": self.queue.dropped,
+            "skipped_duplicates": self.deduper.skipped,
+            "send": self.send_stats.summary(),
+            "end_to_end": self.latency.summary(),
+        }
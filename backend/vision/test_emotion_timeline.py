@@ -0,0 +1,75 @@
+import pytest
+
+from vision.emotion_timeline import EMOTIONS, EmotionTimeline
+
+
+def sample(**scores):
+    return {e: scores.get(e, 0.0) for e in EMOTIONS}
+
+
+def test_mix_averages_samples_in_window():
+    timeline = EmotionTimeline(capacity=10)
+    timeline.add(sample(happy=100.0), 0.2)
+    timeline.add(sample(happy=50.0, neutral=50.0), 0.7)
+    timeline.add(sample(sad=100.0), 3.5)
+
+    first = timeline.mix(0.0, 1.0)
+    assert first["happy"] == pytest.approx(75.0, abs=0.5)
+    assert first["neutral"] == pytest.approx(25.0, abs=0.5)
+    assert timeline.mix(3.0, 4.0)["sad"] == pytest.approx(100.0, abs=0.5)
+    assert timeline.mix(1.0, 3.0) == {}
+    assert timeline.duration == pytest.approx(4.0)
+
+
+def test_empty_timeline():
+    timeline = EmotionTimeline(capacity=10)
+    assert timeline.mix() == {}
+    assert timeline.series(60.0) == []
+
+
+def test_downsampling_keeps_memory_and_weights_by_count():
+    timeline = EmotionTimeline(capacity=4)
+    nbytes = timeline.nbytes
+    # Two samples in the first second, one in each of the next three
+    timeline.add(sample(happy=100.0), 0.0)
+    timeline.add(sample(happy=100.0), 0.5)
+    for t in (1.0, 2.0, 3.0):
+        timeline.add(sample(sad=100.0), t)
+    timeline.add(sample(fear=100.0), 4.0)  # past capacity: buckets merge
+
+    assert timeline.bucket_seconds == 2.0
+    assert timeline.nbytes == nbytes
+    first = timeline.mix(0.0, 2.0)
+    assert first["happy"] == pytest.approx(200.0 / 3, abs=0.5)
+    assert first["sad"] == pytest.approx(100.0 / 3, abs=0.5)
+    assert timeline.mix(4.0, 6.0)["fear"] == pytest.approx(100.0, abs=0.5)
+
+
+def test_first_sample_past_capacity():
+    timeline = EmotionTimeline(capacity=4)
+    timeline.add(sample(angry=100.0), 10.0)
+
+    assert timeline.bucket_seconds == 4.0
+    assert timeline.mix(8.0, 12.0)["angry"] == pytest.approx(100.0, abs=0.5)
+    assert timeline.mix(0.0, 8.0) == {}
+
+
+def test_late_sample_folds_into_open_bucket():
+    timeline = EmotionTimeline(capacity=10)
+    timeline.add(sample(happy=100.0), 2.0)
+    timeline.add(sample(sad=100.0), 1.0)
+
+    assert timeline.mix(1.0, 2.0) == {}
+    assert timeline.mix(2.0, 3.0)["sad"] == pytest.approx(50.0, abs=0.5)
+
+
+def test_series_resolution_is_at_least_one_bucket():
+    timeline = EmotionTimeline(capacity=4)
+    for t in range(8):
+        timeline.add(sample(neutral=100.0), float(t))
+
+    assert timeline.bucket_seconds == 2.0
+    # Asking for 1 s windows still gives one window per 2 s bucket
+    series = timeline.series(1.0)
+    assert len(series) == 4
+    assert all(window["neutral"] == pytest.approx(100.0, abs=0.5) for window in series)
@@ -0,0 +1,224 @@
+import bisect
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+from voice.longform import split_at_pauses
+
+# -------------------------------------------------
+# Whisper model pool
+# -------------------------------------------------
+# A fixed number of WhisperModel instances, each with its own CPU threads,
+# loaded on first use. A caller checks an instance out for the duration of
+# one transcription, so concurrent sessions decode in parallel instead of
+# queueing behind a single model. Silence is skipped with Whisper's Silero
+# VAD. transcribe_long() decodes the speech regions of a long recording
+# together in one batched pass, and transcribe_segments_batch() does the same
+# for several separate utterances (the scheduler merges queued streaming
+# jobs into one such call).
+
+SAMPLE_RATE = 16000
+Segment = Tuple[float, float, str]
+
+
+class _PooledModel:
+    def __init__(self, model: WhisperModel):
+        self.model = model
+        self._batched: Optional[BatchedInferencePipeline] = None
+
+    @property
+    def batched(self) -> BatchedInferencePipeline:
+        if self._batched is None:
+            self._batched = BatchedInferencePipeline(model=self.model)
+        return self._batched
+
+
+class WhisperPool:
+    """Up to `instances` lazily loaded Whisper models shared by all sessions."""
+
+    def __init__(
+        self,
+        model_size: str = "small.en",
+        instances: int = 2,
+        cpu_threads: int = 4,
+        device: str = "cpu",
+        compute_type: str = "int8",
+        batch_size: int = 8,
+        vad_filter: bool = True,
+    ):
+        self.model_size = model_size
+        self.instances = max(1, instances)
+        self.cpu_threads = cpu_threads
+        self.device = device
+        self.compute_type = compute_type
+        self.batch_size = batch_size
+        self.vad_filter = vad_filter
+
+        self._idle: "queue.Queue[_PooledModel]" = queue.Queue()
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+        # Stats
+        self.requests = 0
+        self.batches = 0
+        self.waits = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def _load(self) -> _PooledModel:
+        started = time.perf_counter()
+        model = WhisperModel(
+            self.model_size,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+        print(f"Loaded Whisper {self.model_size} instance in {time.perf_counter() - started:.1f}s")
+        return _PooledModel(model)
+
+    @contextmanager
+    def acquire(self):
+        """Check out a model instance, loading a new one if the pool isn't full."""
+        try:
+            pooled = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                grow = self._loaded < self.instances
+                if grow:
+                    self._loaded += 1
+            if grow:
+                try:
+                    pooled = self._load()
+                except Exception:
+                    with self._lock:
+                        self._loaded -= 1
+                    raise
+            else:
+                self.waits += 1
+                pooled = self._idle.get()
+        started = time.perf_counter()
+        try:
+            yield pooled
+        finally:
+            self.busy_seconds += time.perf_counter() - started
+            self._idle.put(pooled)
+
+    def warmup(self, instances: Optional[int] = None):
+        """Load instances ahead of the first request."""
+        count = min(self.instances, instances or self.instances)
+        held = []
+        try:
+            with self._lock:
+                missing = count - self._loaded
+                self._loaded += max(0, missing)
+            for _ in range(max(0, missing)):
+                held.append(self._load())
+        finally:
+            for pooled in held:
+                self._idle.put(pooled)
+
+    def transcribe_segments(self, audio: np.ndarray, beam_size: int = 1) -> List[Segment]:
+        """(start, end, text) per segment, in seconds from the clip start."""
+        self.requests += 1
+        self.audio_seconds += len(audio) / SAMPLE_RATE
+        with self.acquire() as pooled:
+            segments, _ = pooled.model.transcribe(audio, beam_size=beam_size, vad_filter=self.vad_filter)
+            # Segments are a lazy generator; decode while holding the model
+            return [(s.start, s.end, s.text.strip()) for s in segments]
+
+    def transcribe(self, audio: np.ndarray, beam_size: int = 1) -> str:
+        return " ".join(text for _, _, text in self.transcribe_segments(audio, beam_size) if text).strip()
+
+    def _regions(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        """Sample ranges of at most 30 s to decode; speech only if vad_filter is on."""
+        if self.vad_filter:
+            return split_at_pauses(audio, SAMPLE_RATE)
+        step = 30 * SAMPLE_RATE
+        return [(s, min(s + step, len(audio))) for s in range(0, len(audio), step)]
+
+    def transcribe_segments_batch(self, audios: List[np.ndarray], beam_size: int = 1) -> List[List[Segment]]:
+        """
+        Segments of several utterances from one batched decode. The
+        utterances are laid end to end and their speech regions decoded
+        batch_size at a time; each utterance gets its own segments, with
+        times in seconds from its own start.
+        """
+        if not audios:
+            return []
+        offsets, clips = [], []
+        position = 0
+        for audio in audios:
+            offsets.append(position / SAMPLE_RATE)
+            for start, end in self._regions(audio):
+                clips.append({"start": (position + start) / SAMPLE_RATE, "end": (position + end) / SAMPLE_RATE})
+            position += len(audio)
+        self.requests += len(audios)
+        self.batches += 1
+        self.audio_seconds += position / SAMPLE_RATE
+
+        results: List[List[Segment]] = [[] for _ in audios]
+        if not clips:
+            return results
+        with self.acquire() as pooled:
+            segments, _ = pooled.batched.transcribe(
+                np.concatenate(audios),
+                beam_size=beam_size,
+                clip_timestamps=clips,
+                batch_size=self.batch_size,
+            )
+            for segment in segments:
+                # Clips never cross utterances, so neither do segments
+                idx = max(0, bisect.bisect_right(offsets, segment.start) - 1)
+                offset = offsets[idx]
+                results[idx].append((segment.start - offset, segment.end - offset, segment.text.strip()))
+        return results
+
+    def transcribe_batch(self, audios: List[np.ndarray], beam_size: int = 1) -> List[str]:
+        """Text of several utterances from one batched decode, in order."""
+        return [
+            " ".join(text for _, _, text in segments if text).strip()
+            for segments in self.transcribe_segments_batch(audios, beam_size)
+        ]
+
+    def transcribe_long(self, audio: np.ndarray, beam_size: int = 1, word_timestamps: bool = False) -> list:
+        """
+        Segments of a long recording from one batched decode. The audio is
+        cut at pauses into regions of at most 30 s, which are decoded
+        batch_size at a time. Segment (and word) times are seconds from the
+        start of audio.
+        """
+        regions = self._regions(audio)
+        self.requests += 1
+        self.batches += 1
+        self.audio_seconds += len(audio) / SAMPLE_RATE
+        if not regions:
+            return []
+        clips = [{"start": start / SAMPLE_RATE, "end": end / SAMPLE_RATE} for start, end in regions]
+        with self.acquire() as pooled:
+            segments, _ = pooled.batched.transcribe(
+                audio,
+                beam_size=beam_size,
+                clip_timestamps=clips,
+                batch_size=self.batch_size,
+                word_timestamps=word_timestamps,
+            )
+            return list(segments)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_size,
+            "instances": self.instances,
+            "loaded": self._loaded,
+            "idle": self._idle.qsize(),
+            "cpu_threads": self.cpu_threads,
+            "requests": self.requests,
+            "batches": self.batches,
+            "waits": self.waits,
+            "audio_seconds": self.audio_seconds,
+            "busy_seconds": self.busy_seconds,
+        }
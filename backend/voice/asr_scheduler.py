@@ -0,0 +1,223 @@
+import asyncio
+import collections
+import concurrent.futures
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+# -------------------------------------------------
+# Transcription scheduler
+# -------------------------------------------------
+# One long-lived thread pool runs every transcription job. Jobs wait in
+# priority lanes: an interactive Q&A turn is always taken before streaming
+# re-transcription, which is taken before bulk work such as uploads. On top
+# of `workers` general workers there is always one more that only serves
+# the interactive lane, so a turn never waits behind a long bulk job (the
+# model pool needs workers + 1 instances for that slot to be free). Jobs belong to an owner (the session
+# id) and cancel(owner) drops everything that session still has queued or
+# running. Streaming and bulk jobs submitted with a batch function are merged:
+# a worker that picks one up takes the other queued jobs of that lane with
+# the same batch function too, up to max_batch, and decodes them in one call.
+
+INTERACTIVE = "interactive"
+STREAMING = "streaming"
+BULK = "bulk"
+LANES = (INTERACTIVE, STREAMING, BULK)
+
+
+@dataclass
+class TranscriptionJob:
+    fn: Callable
+    args: tuple
+    lane: str
+    owner: Optional[str]
+    future: asyncio.Future
+    batch: Optional[Callable] = None
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class TranscriptionScheduler:
+    """Bounded, prioritised, cancellable queue in front of the Whisper pool."""
+
+    def __init__(self, workers: int = 2, max_queue: int = 64, max_batch: int = 8, history: int = 200):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.max_batch = max(1, max_batch)
+        self._lanes: Dict[str, Deque[TranscriptionJob]] = {lane: collections.deque() for lane in LANES}
+        self._running: Dict[int, TranscriptionJob] = {}
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._cond: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._ids = itertools.count()
+        self._cancel_epochs: Dict[Optional[str], int] = collections.Counter()
+
+        # Stats
+        self.completed = collections.Counter()
+        self.cancelled = collections.Counter()
+        self.failed = collections.Counter()
+        self.batches = collections.Counter()
+        self.batched = collections.Counter()
+        self._waits: Dict[str, Deque[float]] = {lane: collections.deque(maxlen=history) for lane in LANES}
+
+    def _start(self):
+        if self._tasks:
+            return
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers + 1, thread_name_prefix="asr")
+        self._cond = asyncio.Condition()
+        # The extra worker is held back for interactive turns
+        self._tasks.append(asyncio.create_task(self._worker((INTERACTIVE,))))
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(LANES)))
+
+    @property
+    def depth(self) -> int:
+        return sum(len(q) for q in self._lanes.values())
+
+    def _next_jobs(self, lanes) -> List[TranscriptionJob]:
+        """The next job, plus any queued jobs it can be batched with."""
+        for lane in lanes:
+            queue = self._lanes[lane]
+            if not queue:
+                continue
+            job = queue.popleft()
+            if job.batch is None or lane == INTERACTIVE:
+                return [job]
+            jobs = [job]
+            for other in list(queue):
+                if len(jobs) >= self.max_batch:
+                    break
+                if other.batch == job.batch:
+                    queue.remove(other)
+                    jobs.append(other)
+            return jobs
+        return []
+
+    async def _worker(self, lanes):
+        loop = asyncio.get_running_loop()
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: any(self._lanes[lane] for lane in lanes))
+                jobs = self._next_jobs(lanes)
+                self._cond.notify_all()  # room for a blocked submit
+            jobs = [job for job in jobs if not job.future.done()]
+            if not jobs:
+                continue
+            job_ids = []
+            for job in jobs:
+                self._waits[job.lane].append(time.perf_counter() - job.enqueued_at)
+                job_ids.append(next(self._ids))
+                self._running[job_ids[-1]] = job
+            try:
+                if len(jobs) == 1:
+                    results = [await loop.run_in_executor(self._executor, jobs[0].fn, *jobs[0].args)]
+                else:
+                    results = await loop.run_in_executor(self._executor, jobs[0].batch, [job.args[0] for job in jobs])
+                    self.batches[jobs[0].lane] += 1
+                    self.batched[jobs[0].lane] += len(jobs)
+                for job, result in zip(jobs, results):
+                    if not job.future.done():
+                        job.future.set_result(result)
+                        self.completed[job.lane] += 1
+            except Exception as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                        self.failed[job.lane] += 1
+            finally:
+                for job_id in job_ids:
+                    del self._running[job_id]
+
+    async def submit(
+        self,
+        fn: Callable,
+        *args,
+        lane: str = INTERACTIVE,
+        owner: Optional[str] = None,
+        batch: Optional[Callable] = None,
+    ) -> Any:
+        """
+        Queue fn(*args) on lane and wait for its result. If batch is given,
+        batch([args[0], ...]) must return fn's result for each first
+        argument, and the job may be decoded together with others.
+        """
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane: {lane}")
+        self._start()
+        job = TranscriptionJob(fn, args, lane, owner, asyncio.get_running_loop().create_future(), batch)
+        epoch = self._cancel_epochs[owner]
+        async with self._cond:
+            # Bulk and streaming work waits for room; an interactive turn never does
+            if lane != INTERACTIVE:
+                await self._cond.wait_for(lambda: self.depth < self.max_queue)
+            if self._cancel_epochs[owner] != epoch:
+                # cancel(owner) ran while this job was waiting for room
+                self.cancelled[lane] += 1
+                raise asyncio.CancelledError()
+            self._lanes[lane].append(job)
+            self._cond.notify_all()
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            if not job.future.done():
+                job.future.cancel()
+            raise
+
+    def cancel(self, owner: str) -> int:
+        """Cancel every queued or running job for owner. Running decodes finish, but their results are dropped."""
+        self._cancel_epochs[owner] += 1
+        count = 0
+        for lane, queue in self._lanes.items():
+            for job in [j for j in queue if j.owner == owner]:
+                queue.remove(job)
+                if job.future.cancel():
+                    self.cancelled[lane] += 1
+                    count += 1
+        for job in list(self._running.values()):
+            if job.owner == owner and job.future.cancel():
+                self.cancelled[job.lane] += 1
+                count += 1
+        if count and self._cond is not None:
+            # Freed queue slots; wake submitters waiting for room
+            asyncio.get_running_loop().create_task(self._notify())
+        return count
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane in LANES:
+            waits = np.array(self._waits[lane]) * 1000.0 if self._waits[lane] else np.zeros(1)
+            lanes[lane] = {
+                "queued": len(self._lanes[lane]),
+                "running": sum(1 for j in self._running.values() if j.lane == lane),
+                "completed": self.completed[lane],
+                "cancelled": self.cancelled[lane],
+                "failed": self.failed[lane],
+                "batches": self.batches[lane],
+                "batched_jobs": self.batched[lane],
+                "avg_wait_ms": float(waits.mean()),
+                "p95_wait_ms": float(np.percentile(waits, 95)),
+            }
+        return {
+            "workers": self.workers,
+            "interactive_workers": 1,
+            "depth": self.depth,
+            "max_queue": self.max_queue,
+            "max_batch": self.max_batch,
+            "lanes": lanes,
+        }
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for queue in self._lanes.values():
+            while queue:
+                queue.popleft().future.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
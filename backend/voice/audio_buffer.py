@@ -0,0 +1,88 @@
+import threading
+
+import numpy as np
+
+# -------------------------------------------------
+# Capture buffer
+# -------------------------------------------------
+# Microphone blocks are converted from int16 straight into a preallocated
+# float32 array that doubles when full, so a recording is never held as a
+# list of byte chunks and ASR gets a view of it without another copy.
+# One thread writes; readers can take views from any thread, because samples
+# are never modified once written and growth and discard() copy into a new
+# array before swapping it in, so earlier views stay valid.
+
+
+class AudioBuffer:
+    """Growable float32 buffer of mono samples in [-1, 1)."""
+
+    def __init__(self, rate: int = 16000, seconds: float = 30.0):
+        self.rate = rate
+        self._capacity = max(1, int(rate * seconds))
+        self._data = np.zeros(self._capacity, dtype=np.float32)
+        self._length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def seconds(self) -> float:
+        return self._length / self.rate
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def _reserve(self, n: int):
+        if self._length + n > len(self._data):
+            grown = np.zeros(max(len(self._data) * 2, self._length + n), dtype=np.float32)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+
+    def write_int16(self, data: bytes) -> np.ndarray:
+        """Append raw paInt16 bytes; returns a view of the new samples."""
+        pcm = np.frombuffer(data, dtype=np.int16)
+        n = len(pcm)
+        with self._lock:
+            self._reserve(n)
+            out = self._data[self._length:self._length + n]
+            np.multiply(pcm, 1.0 / 32768.0, out=out, casting="unsafe")
+            self._length += n
+        return out
+
+    def write(self, samples: np.ndarray) -> np.ndarray:
+        """Append float samples; returns a view of them in the buffer."""
+        n = len(samples)
+        with self._lock:
+            self._reserve(n)
+            out = self._data[self._length:self._length + n]
+            out[:] = samples
+            self._length += n
+        return out
+
+    def view(self, start: int = 0, end: int = None) -> np.ndarray:
+        """Samples [start, end) without copying."""
+        end = self._length if end is None else min(end, self._length)
+        return self._data[start:end]
+
+    def discard(self, n: int):
+        """Drop the oldest n samples, safely alongside the writer and existing views."""
+        with self._lock:
+            n = min(n, self._length)
+            if n <= 0:
+                return
+            rest = self._length - n
+            data = np.zeros(max(self._capacity, 2 * rest), dtype=np.float32)
+            data[:rest] = self._data[n:self._length]
+            self._data = data
+            self._length = rest
+
+    def keep_last(self, n: int):
+        """Drop all but the newest n samples (pre-roll before speech starts; not safe with readers)."""
+        if self._length > n:
+            self._data[:n] = self._data[self._length - n:self._length]
+            self._length = n
+
+    def clear(self):
+        self._length = 0
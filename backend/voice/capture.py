@@ -0,0 +1,197 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+import pyaudio
+
+from voice.audio_buffer import AudioBuffer
+from voice.endpointing import SILENCE, SPEECH_END, SPEECH_PAUSE, SPEECH_RESUME, make_endpointer
+
+# -------------------------------------------------
+# Microphone capture
+# -------------------------------------------------
+# A CaptureService keeps one input stream open for the life of a session
+# instead of opening the device for every turn. A capture thread reads
+# fixed-size blocks, keeps a short pre-roll while nobody is speaking, and
+# cuts utterances with an endpointer; finished utterances are handed to the
+# event loop through a small asyncio.Queue (the oldest is dropped when a
+# consumer falls behind). When the speaker pauses mid-turn,
+# on_pause gets the turn so far, so a partial transcript can tell the
+# endpointer whether the turn sounds finished. Only the latest pause's
+# on_pause runs: it is cancelled when the speaker resumes or pauses again. Raw blocks can also be tapped by
+# listeners (the streaming pitch transcriber uses this).
+
+class CaptureService:
+    """One always-open microphone stream producing utterances on an async queue."""
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        block: int = 1024,
+        silence_threshold: float = 100,
+        silence_duration: float = 2.0,
+        pre_roll_seconds: float = 1.0,
+        max_utterance_seconds: float = 120.0,
+        max_queued: int = 4,
+    ):
+        self.rate = rate
+        self.block = block
+        self.pre_roll = int(rate * pre_roll_seconds)
+        self.max_utterance = int(rate * max_utterance_seconds)
+        self.max_queued = max_queued
+        self.endpointer = make_endpointer(rate, block, silence_threshold, silence_duration)
+        self.on_pause: Optional[Callable[[np.ndarray], Awaitable]] = None
+
+        self.listening = True       # cut utterances; when False only listeners get audio
+        self.listeners: List[Callable[[np.ndarray], None]] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._current = AudioBuffer(rate, seconds=10)
+        self._pause_job: Optional[concurrent.futures.Future] = None
+
+        # Stats
+        self.utterances = 0
+        self.dropped = 0
+        self.blocks = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    async def start(self):
+        """Open the stream; call from the event loop that will consume utterances."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._stop.clear()
+        opened = threading.Event()
+        errors = []
+        self._thread = threading.Thread(target=self._capture_loop, args=(opened, errors), daemon=True)
+        self._thread.start()
+        await asyncio.to_thread(opened.wait)
+        if errors:
+            self._thread = None
+            raise errors[0]
+
+    def stop(self):
+        self._stop.set()
+
+    def pause(self):
+        """Stop cutting utterances (listeners still get audio); drops any partial one."""
+        self.listening = False
+        self.endpointer.reset()
+
+    def resume(self, flush: bool = True):
+        """Cut utterances again; by default queued ones from before are dropped."""
+        if flush:
+            self.flush()
+        self.endpointer.reset()
+        self.listening = True
+
+    def flush(self):
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+    async def next_utterance(self) -> np.ndarray:
+        """Wait for the next complete utterance (float32, with pre-roll)."""
+        return await self._queue.get()
+
+    def add_listener(self, listener: Callable[[np.ndarray], None]):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[np.ndarray], None]):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _emit(self, audio: np.ndarray):
+        self.utterances += 1
+        self._loop.call_soon_threadsafe(self._enqueue, audio)
+
+    def _enqueue(self, audio: np.ndarray):
+        # On the event loop; a stale utterance is worth less than a fresh one
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(audio)
+
+    def _cancel_pause_job(self):
+        if self._pause_job is not None:
+            self._pause_job.cancel()
+            self._pause_job = None
+
+    @staticmethod
+    def _pause_job_done(future: concurrent.futures.Future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"on_pause error: {future.exception()}")
+
+    def _process(self, data: bytes):
+        block = self._current.write_int16(data)
+        self.blocks += 1
+        for listener in list(self.listeners):
+            listener(block)
+
+        if not self.listening:
+            if len(self._current) >= 2 * self.pre_roll:
+                self._current.keep_last(self.pre_roll)
+            return
+
+        event = self.endpointer.update(block)
+        if event == SILENCE:
+            if len(self._current) >= 2 * self.pre_roll:
+                self._current.keep_last(self.pre_roll)
+        elif event == SPEECH_PAUSE and self.on_pause is not None:
+            # Supersedes any earlier pause's work in this turn
+            self._cancel_pause_job()
+            self._pause_job = asyncio.run_coroutine_threadsafe(self.on_pause(self._current.view()), self._loop)
+            self._pause_job.add_done_callback(self._pause_job_done)
+        elif event == SPEECH_RESUME:
+            self._cancel_pause_job()
+        elif event == SPEECH_END or len(self._current) >= self.max_utterance:
+            # Hand the buffer off whole and start a fresh one
+            # The last pause's work carries on: it may be about this turn's end
+            self._pause_job = None
+            self._emit(self._current.view())
+            self._current = AudioBuffer(self.rate, seconds=10)
+            self.endpointer.reset()
+
+    def _capture_loop(self, opened: threading.Event, errors: list):
+        try:
+            audio = pyaudio.PyAudio()
+            stream = audio.open(
+                rate=self.rate,
+                format=pyaudio.paInt16,
+                channels=1,
+                input=True,
+                frames_per_buffer=self.block
+            )
+        except Exception as e:
+            errors.append(e)
+            opened.set()
+            return
+        opened.set()
+        try:
+            while not self._stop.is_set():
+                self._process(stream.read(self.block, exception_on_overflow=False))
+        except Exception as e:
+            print(f"Audio capture error: {e}")
+        finally:
+            stream.stop_stream()
+            stream.close()
+            audio.terminate()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "listening": self.listening,
+            "utterances": self.utterances,
+            "dropped": self.dropped,
+            "blocks": self.blocks,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "endpointer": self.endpointer.stats(),
+        }
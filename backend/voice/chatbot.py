@@ -1,17 +1,25 @@
 import os
+import re
+from typing import Any, Callable, List, Optional
 import asyncio
-import numpy as np
-import collections
 from dotenv import load_dotenv
-from voice.personalities import get_personality_chains
+from voice.personalities import PERSONALITIES, get_personality_chains
+from voice.router import JudgeRouter
+from voice.history import PromptHistory
+from prompt_layout import count_tokens
+from voice.asr_pool import WhisperPool
+from voice.audio_buffer import AudioBuffer
+from voice.longform import transcribe_long_audio
+from voice.endpointing import SILENCE, SPEECH_END, make_endpointer
+from voice.tts_pipeline import JudgeOutputParser, PlaybackScheduler
+from voice.tts_cache import TTSCache
+from voice.output import AudioOutput
+from voice.asr_scheduler import BULK, INTERACTIVE, STREAMING, TranscriptionScheduler
 from langchain_openai import ChatOpenAI
-from elevenlabs import ElevenLabs, play
+from elevenlabs import ElevenLabs
 import pyaudio
-from faster_whisper import WhisperModel
-import concurrent.futures
 from langchain.schema import HumanMessage, AIMessage
 from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain.callbacks.base import BaseCallbackHandler
 
 # Load environment variables
 load_dotenv()
@@ -26,11 +34,22 @@ if not ELEVENLABS_API_KEY:
 # -------------------------------------------------
 # Initialize Models
 # -------------------------------------------------
-whisper_model = WhisperModel(
-    "small.en",
-    device="cpu",
-    compute_type="int8"
+# Whisper instances that can transcribe at once, and CPU threads for each
+WHISPER_WORKERS = int(os.getenv("WHISPER_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+WHISPER_THREADS = int(os.getenv("WHISPER_THREADS", max(1, (os.cpu_count() or 2) // WHISPER_WORKERS)))
+# Recordings longer than this are split at pauses and batch-decoded
+LONG_FORM_SECONDS = 30
+
+# Models load on first use, not at import. One instance more than workers,
+# for the scheduler's interactive-only worker
+whisper_pool = WhisperPool(
+    os.getenv("WHISPER_MODEL", "small.en"),
+    instances=WHISPER_WORKERS + 1,
+    cpu_threads=WHISPER_THREADS,
+    batch_size=int(os.getenv("WHISPER_BATCH_SIZE", 8)),
 )
+# Every transcription goes through here, at most one job per pool instance at a time
+transcription_scheduler = TranscriptionScheduler(workers=WHISPER_WORKERS)
 
 elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
 
@@ -38,52 +57,66 @@ elevenlabs_client = ElevenLabs(api_key=ELEVENLABS_API_KEY)
 personalities = get_personality_chains(OPENAI_API_KEY)
 PERSONALITY_NAMES = list(personalities.keys())
 
-# -------------------------------------------------
-# Custom Non-Streaming Handler
-# -------------------------------------------------
-class NonStreamingCallbackHandler(BaseCallbackHandler):
-    def __init__(self):
-        self.complete_response = []
-        
-    async def on_llm_start(self, *args, **kwargs):
-        pass
-
-    async def on_llm_new_token(self, token: str, **kwargs) -> None:
-        self.complete_response.append(token)
-        print(token, end="", flush=True)
-
-    async def on_llm_end(self, *args, **kwargs):
-        pass
-
-    def get_complete_response(self):
-        full_response = ''.join(self.complete_response)
-        clean_response = (
-            full_response
-            .replace('```', '')
-            .replace('SpeakWithEachOther: false', '')
-            .replace('SpeakWithEachOther: true', '')
-            .strip()
-        )
-        return clean_response
-
 # -------------------------------------------------
 # Audio Generation
 # -------------------------------------------------
+TTS_MODEL_ID = "eleven_monolingual_v1"
+# Raw 16-bit mono PCM, so playback (and cache hits) need no decoding
+TTS_OUTPUT_FORMAT = "pcm_24000"
+TTS_SAMPLE_RATE = 24000
+
+tts_cache = TTSCache(
+    os.getenv("TTS_CACHE_DIR", "tts_cache"),
+    max_bytes=int(os.getenv("TTS_CACHE_MB", 200)) * 1024 * 1024,
+)
+
+def synthesize_speech(text: str, voice_id: str, previous_text: str = "") -> bytes:
+    """
+    PCM for one piece of text, from the cache when possible. previous_text
+    keeps prosody continuous across sentences; it isn't part of the cache key.
+    """
+    audio = tts_cache.get(voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, text)
+    if audio is not None:
+        return audio
+    audio = b"".join(elevenlabs_client.text_to_speech.convert(
+        text=text,
+        voice_id=voice_id,
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_OUTPUT_FORMAT,
+        previous_text=previous_text or None
+    ))
+    tts_cache.put(voice_id, TTS_MODEL_ID, TTS_OUTPUT_FORMAT, text, audio)
+    return audio
+
+
 async def generate_and_play_audio(text: str, voice_id: str):
-    try:
-        audio = elevenlabs_client.text_to_speech.convert(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_monolingual_v1"
-        )
-        await asyncio.to_thread(play, audio)
-    except Exception as e:
-        print(f"\nTTS Error: {e}")
+    playback = get_local_playback()
+    playback.say(voice_id, text)
+    await playback.drain()
+
+local_playback: Optional[PlaybackScheduler] = None
+
+def get_local_playback() -> PlaybackScheduler:
+    """Playback queue for the default output device (the console chat loop)."""
+    global local_playback
+    if local_playback is None:
+        async def synthesize(text, voice_id, previous):
+            return await asyncio.to_thread(synthesize_speech, text, voice_id, previous)
+
+        output = AudioOutput(TTS_SAMPLE_RATE)
+        local_playback = PlaybackScheduler(synthesize, output.play, stop_audio=output.interrupt)
+    return local_playback
 
 # -------------------------------------------------
 # Response Generation
 # -------------------------------------------------
-async def get_response(personality_name, history, user_input):
+async def get_response(personality_name, history, user_input, say: Optional[Callable[[str], Any]] = None, speak: bool = True):
+    """
+    Stream a judge's reply. Each sentence of the Message is passed to `say`
+    as soon as it is complete; without it, sentences are spoken locally when
+    speak is True. Returns (route, target, message) once the reply is
+    complete and, when spoken locally, played.
+    """
     personality_data = personalities.get(personality_name)
     if not personality_data:
         # Default fallback if something's off
@@ -92,53 +125,34 @@ async def get_response(personality_name, history, user_input):
     chain = personality_data["chain"]
     voice_id = personality_data["voice_id"]
     
-    handler = NonStreamingCallbackHandler()
+    local = say is None and speak
+    if local:
+        playback = get_local_playback()
+        say = lambda sentence: playback.say(voice_id, sentence)
+    parser = JudgeOutputParser()
     
     try:
         # The chain output must follow:
         #   Route: X
         #   Target: Y (only if X=1)
         #   Message: ...
+        async for chunk in chain.astream({
+            "history": history,
+            "user_input": user_input
+        }):
+            token = chunk.content
+            print(token, end="", flush=True)
+            for sentence in parser.feed(token):
+                if say is not None:
+                    say(sentence)
+        for sentence in parser.close():
+            if say is not None:
+                say(sentence)
+
+        if local:
+            await playback.drain()
         
-        await chain.ainvoke(
-            {
-                "history": history,
-                "user_input": user_input
-            },
-            config={"callbacks": [handler]}
-        )
-        
-        full_output = handler.get_complete_response()
-
-        # Parse route, target, and message from the LLM response
-        route = 0
-        target = None
-        message = ""
-
-        for line in full_output.splitlines():
-            line = line.strip()
-            if line.startswith("Route:"):
-                # e.g. "Route: 1"
-                parts = line.split(":",1)
-                if len(parts) == 2:
-                    try:
-                        route = int(parts[1].strip())
-                    except:
-                        route = 0
-            elif line.startswith("Target:"):
-                parts = line.split(":",1)
-                if len(parts) == 2:
-                    target = parts[1].strip()
-            elif line.startswith("Message:"):
-                # everything after "Message:" is the judge's answer
-                parts = line.split(":",1)
-                if len(parts) == 2:
-                    message = parts[1].strip()
-
-        # Then generate and play the audio
-        await generate_and_play_audio(message, voice_id)
-        
-        return route, target, message
+        return parser.route, parser.target, parser.message
     except Exception as e:
         print(f"Error in get_response: {e}")
         return 0, None, f"I apologize, but I encountered an error: {str(e)}"
@@ -146,7 +160,13 @@ async def get_response(personality_name, history, user_input):
 # -------------------------------------------------
 # Audio Recording and Transcription
 # -------------------------------------------------
-def record_audio(rate=16000, chunk=220, silence_threshold=100, silence_duration=1):
+def record_audio(rate=16000, chunk=1024, silence_threshold=100, silence_duration=1):
+    """
+    Record one utterance, ended by the configured endpointer (at most
+    silence_duration seconds after speech stops). Returns float32
+    samples, with up to silence_duration seconds of audio before speech began.
+    Sessions keep a CaptureService open instead; this opens the device per call.
+    """
     audio = pyaudio.PyAudio()
     stream_audio = audio.open(
         rate=rate,
@@ -156,56 +176,52 @@ def record_audio(rate=16000, chunk=220, silence_threshold=100, silence_duration=
         frames_per_buffer=chunk
     )
 
-    frames = []
-    audio_buffer = collections.deque(maxlen=int((rate / chunk) * silence_duration))
-    long_term_noise_level = 0.0
-    current_noise_level = 0.0
-    voice_activity_detected = False
-    silence_timer = 0.0
+    buffer = AudioBuffer(rate, seconds=30)
+    pre_roll = int(rate * silence_duration)
+    endpointer = make_endpointer(rate, chunk, silence_threshold, silence_duration)
 
     print("Start speaking...")
 
     while True:
         data = stream_audio.read(chunk, exception_on_overflow=False)
-        pegel = np.abs(np.frombuffer(data, dtype=np.int16)).mean()
-
-        long_term_noise_level = long_term_noise_level * 0.99 + pegel * (1.0 - 0.99)
-        current_noise_level = current_noise_level * 0.90 + pegel * (1.0 - 0.90)
-
-        if voice_activity_detected:
-            frames.append(data)
-            if current_noise_level < long_term_noise_level + silence_threshold:
-                silence_timer += chunk / rate
-                if silence_timer >= silence_duration:
-                    break
-            else:
-                silence_timer = 0.0
-        else:
-            if current_noise_level > long_term_noise_level + silence_threshold:
-                voice_activity_detected = True
-                frames.extend(audio_buffer)
-                audio_buffer.clear()
-                silence_timer = 0.0
-            else:
-                audio_buffer.append(data)
+        event = endpointer.update(buffer.write_int16(data))
+        if event == SPEECH_END:
+            break
+        if event == SILENCE and len(buffer) >= 2 * pre_roll:
+            # Only keep the pre-roll while waiting for speech
+            buffer.keep_last(pre_roll)
 
     stream_audio.stop_stream()
     stream_audio.close()
     audio.terminate()
 
-    audio_bytes = b''.join(frames)
-    audio_np = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-    return audio_np
+    return buffer.view()
 
-async def transcribe_audio_async(audio_np):
-    loop = asyncio.get_event_loop()
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        text = await loop.run_in_executor(pool, transcribe_audio, audio_np)
-    return text
+async def transcribe_audio_async(audio_np, lane=INTERACTIVE, owner=None):
+    # Short clips (end-of-turn cues) can share a batched decode with other queued ones
+    batch = whisper_pool.transcribe_batch if len(audio_np) <= LONG_FORM_SECONDS * 16000 else None
+    return await transcription_scheduler.submit(transcribe_audio, audio_np, lane=lane, owner=owner, batch=batch)
 
 def transcribe_audio(audio_np):
-    segments, info = whisper_model.transcribe(audio_np, beam_size=1)
-    return " ".join(segment.text for segment in segments).strip()
+    if len(audio_np) > LONG_FORM_SECONDS * 16000:
+        return transcribe_long_audio(whisper_pool, audio_np, word_timestamps=False)["text"]
+    return whisper_pool.transcribe(audio_np)
+
+async def transcribe_long_audio_async(audio_np, lane=BULK, owner=None):
+    """Text, word timestamps and real-time factor of a long recording."""
+    return await transcription_scheduler.submit(transcribe_long_audio, whisper_pool, audio_np, lane=lane, owner=owner)
+
+async def transcribe_batch_async(audios, lane=BULK, owner=None):
+    """Transcribe several utterances in one batched decode."""
+    return await transcription_scheduler.submit(whisper_pool.transcribe_batch, audios, lane=lane, owner=owner)
+
+async def transcribe_segments_async(audio_np, lane=STREAMING, owner=None):
+    """(start, end, text) per Whisper segment, in seconds from the clip start."""
+    # Streaming partials of concurrent pitches are decoded together when they queue up
+    return await transcription_scheduler.submit(
+        whisper_pool.transcribe_segments, audio_np, lane=lane, owner=owner,
+        batch=whisper_pool.transcribe_segments_batch,
+    )
 
 # -------------------------------------------------
 # Decider Chain
@@ -220,7 +236,17 @@ decider_llm = ChatOpenAI(
 DECIDER_SYSTEM_PROMPT = """You are a router that chooses which personality (RBC Judge, Google Judge, or 1Password Judge) is best suited to respond based on the user's message. 
 Reply with only one name: "RBC Judge", "Google Judge", or "1Password Judge" (nothing else)."""
 
+# Answers most turns locally; the LLM is only asked when it isn't sure
+judge_router = JudgeRouter([p for p in PERSONALITIES if p["name"] in personalities])
+
 async def decide_personality(user_text: str) -> str:
+    judge, score = judge_router.route(user_text)
+    if judge is not None:
+        return judge
+    return await llm_decide_personality(user_text)
+
+async def llm_decide_personality(user_text: str) -> str:
+    """Ask the LLM router, for turns the local router wasn't sure about."""
     messages = [
         {"role": "system", "content": DECIDER_SYSTEM_PROMPT},
         {"role": "user", "content": user_text},
@@ -229,6 +255,59 @@ async def decide_personality(user_text: str) -> str:
     text = output.generations[0][0].text.strip()
     return text if text in PERSONALITY_NAMES else "RBC Judge"
 
+# -------------------------------------------------
+# Conversation History
+# -------------------------------------------------
+# Recent Q&A kept verbatim in judge prompts, in tokens; older turns are summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1200))
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a pitch Q&A between a user and hackathon judges.
+Given the summary so far and the next lines of the conversation, reply with an updated summary of at most 120 words.
+Keep which judge asked what, the user's key answers, and any open concerns. Reply with the summary only."""
+
+async def summarize_history(summary: str, lines: List[str]) -> str:
+    messages = [
+        {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Summary so far:\n{summary or '(none)'}\n\nNext lines:\n{''.join(lines)}"},
+    ]
+    output = await decider_llm.agenerate([messages])
+    return output.generations[0][0].text
+
+def prompt_history(pinned: int = 1) -> PromptHistory:
+    return PromptHistory(summarize_history, count_tokens, budget_tokens=HISTORY_TOKEN_BUDGET, pinned=pinned)
+
+# -------------------------------------------------
+# Opening Questions
+# -------------------------------------------------
+question_llm = ChatOpenAI(
+    api_key=OPENAI_API_KEY,
+    model_name="gpt-4o-mini",
+    temperature=0.8,
+    streaming=False,
+)
+
+async def generate_opening_questions(personality_name: str, pitch_text: str, n: int = 3) -> List[str]:
+    """n candidate first questions from one judge about a pitch, best first."""
+    persona = next(p for p in PERSONALITIES if p["name"] == personality_name)
+    system = (
+        f"You are {persona['name']}, {persona['description']}\n"
+        f"You have just heard the pitch below and will open the Q&A. Write {n} different opening questions "
+        f"you could ask, best first, one per line with no numbering. Each must be a single conversational "
+        f"question under 30 words about something the pitch actually said, focusing where it fits on: "
+        f"{', '.join(persona['question_focus'])}."
+    )
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": pitch_text},
+    ]
+    output = await question_llm.agenerate([messages])
+    questions = []
+    for line in output.generations[0][0].text.splitlines():
+        line = re.sub(r"^\s*(?:\d+[.)]|[-*•])\s*", "", line).strip().strip('"')
+        if line:
+            questions.append(line)
+    return questions[:n]
+
 # -------------------------------------------------
 # Main Chat Loop (Example)
 # -------------------------------------------------
@@ -237,6 +316,7 @@ async def decide_personality(user_text: str) -> str:
 # since we are hooking into FastAPI instead.
 async def chat_loop():
     chat_history = ChatMessageHistory()
+    history = prompt_history(pinned=0)
     print("\n Chatbot is ready. Press Enter to speak. Type 'exit' to quit.")
 
     while True:
@@ -258,13 +338,7 @@ async def chat_loop():
 
         print(f"You said: {user_input}")
         chat_history.add_message(HumanMessage(content=user_input))
-
-        formatted_history = ""
-        for message in chat_history.messages:
-            if isinstance(message, HumanMessage):
-                formatted_history += f"User: {message.content}\n"
-            elif isinstance(message, AIMessage):
-                formatted_history += f"Assistant: {message.content}\n"
+        history.add("User", user_input)
 
         chosen_personality = None
         for p in PERSONALITY_NAMES:
@@ -276,5 +350,6 @@ async def chat_loop():
             chosen_personality = await decide_personality(user_input)
 
         print(f"\n{chosen_personality}: ", end="", flush=True)
-        route, target, response = await get_response(chosen_personality, formatted_history, user_input)
+        route, target, response = await get_response(chosen_personality, history.render(), user_input)
         chat_history.add_message(AIMessage(content=response))
+        history.add("Assistant", response)
@@ -0,0 +1,286 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# -------------------------------------------------
+# End-of-turn detection
+# -------------------------------------------------
+# Endpointers are fed one float32 block at a time and say whether the
+# speaker is silent, starting, talking, pausing or done. EnergyEndpointer is
+# the original level comparison with a fixed silence wait. SileroEndpointer
+# scores each block with the Silero VAD model that ships with faster-whisper
+# (run through onnxruntime) and waits an adaptive hangover instead: it gets
+# shorter while turns end cleanly, longer when the speaker keeps going right
+# after a cut. A partial transcript of the turn can nudge the current pause's
+# wait either way, within the same bounds.
+
+SPEECH_START = "start"
+SPEECH = "speech"
+SPEECH_PAUSE = "pause"      # first block of a pause long enough to be worth a partial transcript
+SPEECH_RESUME = "resume"    # speech again after a SPEECH_PAUSE, within the same turn
+SPEECH_END = "end"
+SILENCE = "silence"
+
+
+class EnergyEndpointer:
+    """
+    Level-based start/end of speech: speech starts when the short-term level
+    rises silence_threshold above the long-term noise floor and ends after
+    silence_duration seconds below it.
+    """
+
+    def __init__(self, rate: int = 16000, block: int = 1024, silence_threshold: float = 100, silence_duration: float = 1.0):
+        self.rate = rate
+        self.block = block
+        self.silence_threshold = silence_threshold
+        self.silence_duration = silence_duration
+        # Smoothing was tuned for 220-sample reads; keep the same time
+        # constants for whatever block size is read
+        self.long_term_decay = 0.99 ** (block / 220)
+        self.current_decay = 0.90 ** (block / 220)
+        self.long_term_noise_level = 0.0
+        self.current_noise_level = 0.0
+        self.reset()
+
+    def reset(self):
+        """Forget the current utterance; the noise floor is kept."""
+        self.in_speech = False
+        self.silence_timer = 0.0
+
+    def hint(self, text: str):
+        """Partial transcripts don't change a fixed silence wait."""
+
+    def update(self, block: np.ndarray) -> str:
+        """Feed one float32 block; returns SILENCE, SPEECH_START, SPEECH or SPEECH_END."""
+        pegel = float(np.abs(block).mean()) * 32768.0
+        self.long_term_noise_level = self.long_term_noise_level * self.long_term_decay + pegel * (1.0 - self.long_term_decay)
+        self.current_noise_level = self.current_noise_level * self.current_decay + pegel * (1.0 - self.current_decay)
+        loud = self.current_noise_level > self.long_term_noise_level + self.silence_threshold
+
+        if not self.in_speech:
+            if loud:
+                self.in_speech = True
+                self.silence_timer = 0.0
+                return SPEECH_START
+            return SILENCE
+
+        if loud:
+            self.silence_timer = 0.0
+        else:
+            self.silence_timer += len(block) / self.rate
+            if self.silence_timer >= self.silence_duration:
+                self.reset()
+                return SPEECH_END
+        return SPEECH
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": "energy",
+            "hangover_s": self.silence_duration,
+            "noise_floor": self.long_term_noise_level,
+        }
+
+
+# Words a sentence rarely ends on: the speaker is probably mid-thought
+_CONTINUATION = re.compile(
+    r"(\b(and|but|so|or|because|um+|uh+|like|the|a|an|to|of|with|that|which|if|then)|,|-)\s*$",
+    re.IGNORECASE,
+)
+# Whisper ends almost every segment with a period, so only a question,
+# an exclamation or a sign-off counts as a finished turn
+_TERMINAL = re.compile(
+    r"([?!]|\b(that's it|that is all|thank you|thanks|any questions)[.!]?)\s*$",
+    re.IGNORECASE,
+)
+
+# How far a cue moves the current pause's wait from the adaptive hangover
+_CUE_SCALE = {"end": 0.75, "continue": 1.5}
+
+
+def turn_end_cue(text: str) -> Optional[str]:
+    """'end' if a partial transcript reads like a finished turn, 'continue' if it trails off, else None."""
+    text = text.strip()
+    if not text:
+        return None
+    if _CONTINUATION.search(text):
+        return "continue"
+    if _TERMINAL.search(text):
+        return "end"
+    return None
+
+
+class SileroEndpointer:
+    """
+    VAD-driven end-of-turn with an adaptive hangover. The hangover starts at
+    target_latency and stays within [min_hangover, max_hangover]. A cut counts
+    as false if speech resumes within resume_window seconds; the hangover grows
+    while the false-cut rate is above max_false_cut_rate and shrinks back
+    towards target_latency while it isn't.
+    """
+
+    def __init__(
+        self,
+        rate: int = 16000,
+        block: int = 1024,
+        threshold: float = 0.5,
+        target_latency: float = 0.6,
+        min_hangover: float = 0.25,
+        max_hangover: float = 2.0,
+        max_false_cut_rate: float = 0.1,
+        pause_seconds: float = 0.2,
+        resume_window: float = 1.5,
+        min_speech_seconds: float = 0.15,
+    ):
+        from faster_whisper.vad import get_vad_model
+
+        if rate != 16000:
+            raise ValueError("Silero VAD endpointing needs 16 kHz audio")
+        self.model = get_vad_model()
+        self.rate = rate
+        self.block = block
+        self.threshold = threshold
+        self.target_latency = target_latency
+        self.min_hangover = min_hangover
+        self.max_hangover = max_hangover
+        self.max_false_cut_rate = max_false_cut_rate
+        self.pause_seconds = pause_seconds
+        self.resume_window = resume_window
+        self.min_speech_seconds = min_speech_seconds
+
+        self.hangover = target_latency
+        # Blocks are scored with a little preceding audio for context
+        self._window = 512
+        self._context = np.zeros(3 * self._window, dtype=np.float32)
+        self._since_end: Optional[float] = None
+        self._cue: Optional[str] = None
+        # hint() comes from the event loop, update() from the capture thread
+        self._lock = threading.Lock()
+
+        # Stats
+        self.turns = 0
+        self.false_cuts = 0
+        self.last_probability = 0.0
+        self.reset()
+
+    def reset(self):
+        self.in_speech = False
+        self.speech_time = 0.0
+        self.silence_timer = 0.0
+        self._paused = False
+        self._cue = None
+
+    def hint(self, text: str):
+        """Nudge the current pause's hangover from a partial transcript of the turn."""
+        cue = turn_end_cue(text)
+        with self._lock:
+            if self.in_speech and self._paused:
+                self._cue = cue
+
+    @property
+    def false_cut_rate(self) -> float:
+        return self.false_cuts / self.turns if self.turns else 0.0
+
+    def _probability(self, block: np.ndarray) -> float:
+        samples = np.concatenate([self._context, block])
+        usable = len(samples) - len(samples) % self._window
+        samples = samples[len(samples) - usable:]
+        self._context = samples[-len(self._context):].copy()
+        probs = self.model(samples).reshape(-1)
+        # Only the windows covering this block
+        fresh = max(1, int(np.ceil(len(block) / self._window)))
+        return float(probs[-fresh:].max())
+
+    def _current_hangover(self) -> float:
+        scaled = self.hangover * _CUE_SCALE.get(self._cue, 1.0)
+        return min(self.max_hangover, max(self.min_hangover, scaled))
+
+    def _adapt(self, false_cut: bool):
+        if false_cut:
+            self.false_cuts += 1
+        if self.false_cut_rate > self.max_false_cut_rate:
+            self.hangover = min(self.max_hangover, self.hangover * 1.15)
+        else:
+            self.hangover = max(self.target_latency, self.hangover * 0.97)
+
+    def update(self, block: np.ndarray) -> str:
+        """Feed one float32 block; returns SILENCE, SPEECH_START, SPEECH, SPEECH_PAUSE, SPEECH_RESUME or SPEECH_END."""
+        seconds = len(block) / self.rate
+        prob = self._probability(block)
+        self.last_probability = prob
+        with self._lock:
+            return self._step(prob, seconds)
+
+    def _step(self, prob: float, seconds: float) -> str:
+        voiced = prob >= self.threshold
+        # Hysteresis: stay in speech until clearly below threshold
+        quiet = prob < self.threshold - 0.15
+
+        if not self.in_speech:
+            if self._since_end is not None:
+                self._since_end += seconds
+            if voiced:
+                self.in_speech = True
+                self.speech_time = seconds
+                self.silence_timer = 0.0
+                if self._since_end is not None and self._since_end < self.resume_window:
+                    # The speaker carried on right after the last cut
+                    self._adapt(True)
+                self._since_end = None
+                return SPEECH_START
+            if self._since_end is not None and self._since_end >= self.resume_window:
+                self._adapt(False)
+                self._since_end = None
+            return SILENCE
+
+        if not quiet:
+            self.speech_time += seconds
+            self.silence_timer = 0.0
+            self._cue = None
+            if self._paused:
+                self._paused = False
+                return SPEECH_RESUME
+            return SPEECH
+
+        self.silence_timer += seconds
+        if self.silence_timer >= self._current_hangover() and self.speech_time >= self.min_speech_seconds:
+            self.turns += 1
+            self._since_end = 0.0
+            self.reset()
+            return SPEECH_END
+        if not self._paused and self.silence_timer >= self.pause_seconds:
+            self._paused = True
+            return SPEECH_PAUSE
+        return SPEECH
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": "silero",
+            "hangover_s": self.hangover,
+            "turns": self.turns,
+            "false_cuts": self.false_cuts,
+            "false_cut_rate": self.false_cut_rate,
+            "speech_probability": self.last_probability,
+        }
+
+
+def make_endpointer(rate: int = 16000, block: int = 1024, silence_threshold: float = 100, silence_duration: float = 2.0):
+    """
+    The endpointer named by the ENDPOINTER env var ("silero" by default, or
+    "energy"). Falls back to the energy endpointer if the VAD model can't load.
+    """
+    kind = os.getenv("ENDPOINTER", "silero").lower()
+    if kind == "silero":
+        try:
+            return SileroEndpointer(
+                rate,
+                block,
+                target_latency=float(os.getenv("ENDPOINT_TARGET_LATENCY", 0.6)),
+                max_false_cut_rate=float(os.getenv("ENDPOINT_MAX_FALSE_CUT_RATE", 0.1)),
+                max_hangover=silence_duration,
+            )
+        except Exception as e:
+            print(f"Silero endpointer unavailable, using energy endpointing: {e}")
+    return EnergyEndpointer(rate, block, silence_threshold, silence_duration)
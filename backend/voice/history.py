@@ -0,0 +1,121 @@
+import asyncio
+import collections
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# -------------------------------------------------
+# Token-budgeted prompt history
+# -------------------------------------------------
+# The "Previous conversation" block of a judge prompt. Lines are appended as
+# messages arrive instead of re-rendering the whole chat each turn. The
+# first `pinned` lines (the pitch) stay verbatim, as do the most recent
+# turns. Once those recent turns pass budget_tokens, the oldest are folded
+# into a rolling summary by a background task. They stay in the prompt
+# until the new summary is ready, then are swapped out together. Per-turn
+# prompt size stays bounded however long the Q&A runs.
+
+
+class PromptHistory:
+    """Incrementally built conversation history: pinned lines, rolling summary, recent turns."""
+
+    def __init__(
+        self,
+        summarize: Callable[[str, List[str]], Awaitable[str]],
+        count_tokens: Callable[[str], int],
+        budget_tokens: int = 1200,
+        pinned: int = 1,
+    ):
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.budget_tokens = budget_tokens
+        self.pinned = pinned
+
+        self._pinned: List[str] = []
+        self._recent: Deque[Tuple[str, int]] = collections.deque()
+        self._recent_tokens = 0
+        self.summary = ""
+        self._summary_tokens = 0
+        self._text: Optional[str] = ""
+        self._compacting: Optional[asyncio.Task] = None
+        self.messages = 0
+
+        # Stats
+        self.compactions = 0
+        self.compacted_lines = 0
+        self.failed_compactions = 0
+
+    def add(self, label: str, text: str):
+        line = f"{label}: {text}\n"
+        self.messages += 1
+        if len(self._pinned) < self.pinned:
+            self._pinned.append(line)
+            self._text = None
+            return
+        self._recent.append((line, self.count_tokens(line)))
+        self._recent_tokens += self._recent[-1][1]
+        if self._text is not None:
+            self._text += line
+        if self._recent_tokens > self.budget_tokens:
+            self._compact()
+
+    def _compact(self):
+        if self._compacting is not None and not self._compacting.done():
+            return
+        # Fold the oldest turns until what's left fits in half the budget,
+        # so a compaction isn't needed again on the very next turn
+        lines, tokens = [], self._recent_tokens
+        for line, n in self._recent:
+            if tokens <= self.budget_tokens // 2 or len(lines) == len(self._recent) - 1:
+                break
+            lines.append(line)
+            tokens -= n
+        if lines:
+            self._compacting = asyncio.create_task(self._fold(lines))
+
+    async def _fold(self, lines: List[str]):
+        try:
+            summary = await self.summarize(self.summary, lines)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"History summary failed: {e}")
+            self.failed_compactions += 1
+            return
+        for _ in lines:
+            _, n = self._recent.popleft()
+            self._recent_tokens -= n
+        self.summary = summary.strip()
+        self._summary_tokens = self.count_tokens(self.summary)
+        self._text = None
+        self.compactions += 1
+        self.compacted_lines += len(lines)
+
+    def render(self) -> str:
+        if self._text is None:
+            parts = list(self._pinned)
+            if self.summary:
+                parts.append(f"(Summary of earlier Q&A: {self.summary})\n")
+            parts.extend(line for line, _ in self._recent)
+            self._text = "".join(parts)
+        return self._text
+
+    def cancel(self):
+        if self._compacting is not None:
+            self._compacting.cancel()
+
+    @property
+    def tokens(self) -> int:
+        """Approximate size of render(), pinned lines excluded."""
+        return self._recent_tokens + self._summary_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "recent_lines": len(self._recent),
+            "recent_tokens": self._recent_tokens,
+            "summary_tokens": self._summary_tokens,
+            "budget_tokens": self.budget_tokens,
+            "compactions": self.compactions,
+            "compacted_lines": self.compacted_lines,
+            "failed_compactions": self.failed_compactions,
+            "compacting": self._compacting is not None and not self._compacting.done(),
+        }
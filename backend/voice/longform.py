@@ -0,0 +1,74 @@
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+# -------------------------------------------------
+# Long-form transcription
+# -------------------------------------------------
+# A single transcribe() call decodes a long recording serially. Here the
+# audio is cut at VAD-detected pauses into chunks of at most
+# max_chunk_seconds, the chunks are decoded together by a pooled model's
+# batched pipeline, and text and word timestamps are stitched back together
+# in order.
+
+
+def split_at_pauses(
+    audio: np.ndarray,
+    sampling_rate: int = 16000,
+    max_chunk_seconds: float = 30.0,
+    min_silence_ms: int = 300,
+) -> List[Tuple[int, int]]:
+    """(start, end) sample ranges of speech, merged up to max_chunk_seconds and cut at pauses."""
+    speech = get_speech_timestamps(
+        audio,
+        VadOptions(
+            min_silence_duration_ms=min_silence_ms,
+            speech_pad_ms=200,
+            max_speech_duration_s=max_chunk_seconds,
+        ),
+        sampling_rate=sampling_rate,
+    )
+    max_len = int(max_chunk_seconds * sampling_rate)
+    chunks = []
+    for region in speech:
+        start, end = region["start"], region["end"]
+        if chunks and end - chunks[-1][0] <= max_len:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+    return chunks
+
+
+def transcribe_long_audio(
+    pool,
+    audio: np.ndarray,
+    sampling_rate: int = 16000,
+    beam_size: int = 1,
+    word_timestamps: bool = True,
+) -> Dict[str, Any]:
+    """
+    Transcribe a long float32 recording with one of pool's models.
+    Returns the stitched text, word timestamps and the real-time factor.
+    """
+    started = time.perf_counter()
+    segments = pool.transcribe_long(audio, beam_size=beam_size, word_timestamps=word_timestamps)
+    texts, words = [], []
+    for segment in segments:
+        if segment.text.strip():
+            texts.append(segment.text.strip())
+        for w in segment.words or []:
+            words.append({"word": w.word, "start": w.start, "end": w.end, "probability": w.probability})
+    elapsed = time.perf_counter() - started
+    duration = len(audio) / sampling_rate
+    rtf = (elapsed / duration) if duration else 0.0
+    print(f"Transcribed {duration:.0f}s of audio in {elapsed:.1f}s (RTF {rtf:.2f})")
+    return {
+        "text": " ".join(texts).strip(),
+        "words": words,
+        "segments": len(segments),
+        "duration": duration,
+        "elapsed": elapsed,
+        "rtf": rtf,
+    }
@@ -0,0 +1,115 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Dict, Optional
+
+import pyaudio
+
+# -------------------------------------------------
+# Audio output
+# -------------------------------------------------
+# One PyAudio output stream, opened on first use and kept open, fed 16-bit
+# PCM by a writer thread. Clips queued back to back are written into the
+# same stream with no reopen or decode in between, so there are no gaps.
+# Clips are written in short blocks, so interrupt() takes effect within one
+# block rather than at the end of a sentence.
+
+
+class AudioOutput:
+    """Long-lived PCM output stream with queued, interruptible playback."""
+
+    def __init__(self, rate: int = 24000, channels: int = 1, block_ms: int = 40):
+        self.rate = rate
+        self.channels = channels
+        self.block_bytes = int(rate * block_ms / 1000) * 2 * channels
+        self._queue: "queue.Queue" = queue.Queue()
+        self._generation = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Stats
+        self.clips = 0
+        self.interrupts = 0
+        self.played_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+            self._thread.start()
+
+    async def play(self, pcm: bytes) -> bool:
+        """Queue pcm after anything already queued; True once fully played, False if interrupted."""
+        if self._closed or not pcm:
+            return False
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+
+        def finish(played: bool):
+            try:
+                loop.call_soon_threadsafe(lambda: done.done() or done.set_result(played))
+            except RuntimeError:
+                pass  # loop already closed
+
+        self._ensure_started()
+        self._queue.put((pcm, self._generation, finish))
+        return await done
+
+    def interrupt(self):
+        """Stop the current clip mid-buffer and drop everything queued."""
+        self._generation += 1
+        self.interrupts += 1
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[2](False)
+
+    def _writer_loop(self):
+        audio = pyaudio.PyAudio()
+        stream = None
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                pcm, generation, finish = item
+                if generation != self._generation:
+                    finish(False)
+                    continue
+                if stream is None:
+                    try:
+                        stream = audio.open(format=pyaudio.paInt16, channels=self.channels, rate=self.rate, output=True)
+                    except Exception as e:
+                        print(f"Audio output error: {e}")
+                        finish(False)
+                        continue
+                played = True
+                for offset in range(0, len(pcm), self.block_bytes):
+                    if generation != self._generation:
+                        played = False
+                        break
+                    stream.write(pcm[offset:offset + self.block_bytes])
+                self.clips += 1
+                self.played_seconds += min(offset + self.block_bytes, len(pcm)) / (2 * self.channels * self.rate)
+                finish(played)
+        finally:
+            if stream is not None:
+                stream.stop_stream()
+                stream.close()
+            audio.terminate()
+
+    def close(self):
+        self._closed = True
+        self.interrupt()
+        self._queue.put(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "clips": self.clips,
+            "interrupts": self.interrupts,
+            "played_seconds": self.played_seconds,
+            "queued": self._queue.qsize(),
+        }
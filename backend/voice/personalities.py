@@ -1,5 +1,5 @@
 
-from langchain.prompts import PromptTemplate
+from prompt_layout import escape_braces, stable_prompt
 from langchain_openai import ChatOpenAI
 
 PERSONALITIES = [
@@ -102,6 +102,13 @@ PERSONALITIES = [
     # }
 ]
 
+def pinned_history(inputs) -> str:
+    """Start of a Q&A prompt's tail shared by every turn of a session: the pitch, pinned first in history."""
+    history = inputs["history"]
+    if not history.startswith("User (Pitch):"):
+        return ""
+    return "Previous conversation:\n" + history.split("\n", 1)[0] + "\n"
+
 def get_personality_chains(openai_api_key):
     chains = {}
     
@@ -129,23 +136,28 @@ def get_personality_chains(openai_api_key):
                 )
             prize_info = "\n\nYou are judging for multiple prize categories:\n" + "\n\n".join(categories_info)
 
-        prompt = PromptTemplate(
-            input_variables=["user_input", "history"],  # Add history as input variable
-            template=(
-                f"You are {personality['name']}, {personality['description']}{prize_info}\n\n"
-                "You should ask one single question based on your expertise and the conversation context.\n"
-                "Your response should also make sense and be conversational based on what was previously said.\n"
-                "If the user indicates they don't want to present or answer questions, acknowledge this politely and ask if there's anything else you can help with.\n"
-                f"Focus your questions on these areas when appropriate: {', '.join(personality['question_focus'])}.\n\n"
-                "Previous conversation:\n{history}\n\n" 
-                "User: {user_input}\n\n"
-                "If you use Route=1, also specify 'Target:' with the other personality's name.\n"
-                "Your response MUST follow this exact format:\n\n"
-                "Route: X\n"
-                "Target: (only if X=1)\n"
-                "Message: <your text>\n\n"
-                f"{personality['name']}: "
-            ),
+        # Everything fixed for this judge comes first and never varies between
+        # calls, so the provider can cache it; the conversation goes last
+        prefix = (
+            f"You are {personality['name']}, {personality['description']}{prize_info}\n\n"
+            "You should ask one single question based on your expertise and the conversation context.\n"
+            "Your response should also make sense and be conversational based on what was previously said.\n"
+            "If the user indicates they don't want to present or answer questions, acknowledge this politely and ask if there's anything else you can help with.\n"
+            f"Focus your questions on these areas when appropriate: {', '.join(personality['question_focus'])}.\n\n"
+            "If you use Route=1, also specify 'Target:' with the other personality's name.\n"
+            "Your response MUST follow this exact format:\n\n"
+            "Route: X\n"
+            "Target: (only if X=1)\n"
+            "Message: <your text>\n\n"
+        )
+        prompt = stable_prompt(
+            f"qna:{personality['name']}",
+            prefix,
+            "Previous conversation:\n{history}\n\n"
+            "User: {user_input}\n\n"
+            + escape_braces(personality['name']) + ": ",
+            input_variables=["user_input", "history"],
+            session_prefix=pinned_history,
         )
 
         # Create an LLM chain for each personality
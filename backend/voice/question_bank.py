@@ -0,0 +1,196 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from voice.router import content_words
+from voice.tts_pipeline import SentenceSplitter
+
+# -------------------------------------------------
+# Opening question bank
+# -------------------------------------------------
+# The first Q&A question would otherwise need routing, a full LLM reply and
+# speech synthesis after /begin_qna. While the pitch is being captured, a
+# QuestionBank drafts a few opening questions per judge from the transcript
+# so far and ranks them by how closely they refer to the pitch. Only the top
+# question of the judge chosen for the pitch is pre-synthesized, once that
+# build is published, so its audio is already in the TTS cache. The bank
+# rebuilds as the transcript grows, and once more on the final transcript if
+# that adds much; a newer build cancels an older one still in flight. Q&A
+# then opens with that top question.
+
+
+@dataclass
+class OpeningQuestion:
+    judge: str
+    text: str
+    score: float
+    synthesized: bool = False
+
+    def sentences(self) -> List[str]:
+        """The question cut into sentences the way streamed judge replies are."""
+        splitter = SentenceSplitter()
+        return splitter.feed(self.text + " ") + splitter.flush()
+
+
+def rank_questions(judge: str, questions: List[str], pitch_text: str) -> List[OpeningQuestion]:
+    """
+    Best first. Questions that pick up the pitch's own words beat generic
+    ones; the generator's own order breaks ties, and long questions lose a
+    little since they take longer to say.
+    """
+    pitch_words = set(content_words(pitch_text))
+    ranked = []
+    for i, text in enumerate(questions):
+        words = content_words(text)
+        grounding = sum(1 for w in words if w in pitch_words) / len(words) if words else 0.0
+        length_penalty = 0.01 * max(0, len(text.split()) - 30)
+        ranked.append(OpeningQuestion(judge, text, grounding + 0.1 / (1 + i) - length_penalty))
+    ranked.sort(key=lambda q: q.score, reverse=True)
+    return ranked
+
+
+class QuestionBank:
+    """Ranked opening questions for each judge, built from the pitch so far; the opener is pre-synthesized."""
+
+    def __init__(
+        self,
+        judges: List[str],
+        generate: Callable[[str, str], Awaitable[List[str]]],
+        decide: Callable[[str], Awaitable[str]],
+        synthesize: Callable[[str, str], Awaitable[Any]],
+        voices: Dict[str, str],
+        synthesize_top: int = 1,
+        min_words: int = 40,
+        growth: float = 2.0,
+        final_growth: float = 1.25,
+    ):
+        self.judges = judges
+        self.generate = generate
+        self.decide = decide
+        self.synthesize = synthesize
+        self.voices = voices
+        self.synthesize_top = synthesize_top
+        self.min_words = min_words
+        self.growth = growth
+        self.final_growth = final_growth
+
+        # Results of the last completed build
+        self.questions: Dict[str, List[OpeningQuestion]] = {}
+        self.opener_judge: Optional[str] = None
+        self._build: Optional[asyncio.Task] = None
+        self._build_words = 0
+        self._synthesized_texts: set = set()
+
+        # Stats
+        self.builds = 0
+        self.cancelled_builds = 0
+        self.failed_builds = 0
+        self.last_build_s = 0.0
+        self.synthesized = 0
+        self.served = 0
+        self.missed = 0
+
+    def update(self, pitch_text: str, final: bool = False) -> bool:
+        """Start a build on pitch_text if it has grown enough since the last one; True if one started."""
+        words = len(pitch_text.split())
+        if not final and words < self.min_words:
+            return False
+        if self._build_words and words < self._build_words * (self.final_growth if final else self.growth):
+            return False
+        if self._build is not None and not self._build.done():
+            self._build.cancel()
+            self.cancelled_builds += 1
+        self._build_words = words
+        self._build = asyncio.create_task(self._run_build(pitch_text))
+        return True
+
+    async def _questions_for(self, judge: str, pitch_text: str) -> List[OpeningQuestion]:
+        return rank_questions(judge, await self.generate(judge, pitch_text), pitch_text)
+
+    async def _synthesize_opener(self):
+        """Warm the TTS cache for the opener judge's top questions in the published build."""
+        voice_id = self.voices.get(self.opener_judge)
+        if not voice_id:
+            return
+        for question in self.questions.get(self.opener_judge, [])[:self.synthesize_top]:
+            # Rebuilds often rank the same question first again
+            if question.text not in self._synthesized_texts:
+                for sentence in question.sentences():
+                    await self.synthesize(sentence, voice_id)
+                self._synthesized_texts.add(question.text)
+                self.synthesized += 1
+            question.synthesized = True
+
+    async def _run_build(self, pitch_text: str):
+        started = time.monotonic()
+        try:
+            decision = asyncio.create_task(self.decide(pitch_text))
+            results = await asyncio.gather(
+                *(self._questions_for(judge, pitch_text) for judge in self.judges),
+                return_exceptions=True,
+            )
+            opener_judge = await decision
+        except asyncio.CancelledError:
+            decision.cancel()
+            raise
+        except Exception as e:
+            print(f"Question bank build failed: {e}")
+            self.failed_builds += 1
+            return
+        questions = {}
+        for judge, result in zip(self.judges, results):
+            if isinstance(result, BaseException):
+                print(f"Opening questions for {judge} failed: {result}")
+            elif result:
+                questions[judge] = result
+        if not questions:
+            self.failed_builds += 1
+            return
+        # Publish at once, so an opener never mixes two builds
+        self.questions = questions
+        self.opener_judge = opener_judge
+        self.builds += 1
+        self.last_build_s = time.monotonic() - started
+        try:
+            await self._synthesize_opener()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Opening question synthesis failed: {e}")
+
+    async def opener(self, timeout: float = 0.0) -> Optional[OpeningQuestion]:
+        """
+        Take the best question for the chosen judge, waiting up to timeout
+        seconds for a build in flight. Falls back to the last completed
+        build, then to None.
+        """
+        if self._build is not None and not self._build.done() and timeout > 0:
+            await asyncio.wait({self._build}, timeout=timeout)
+        judge = self.opener_judge
+        if judge not in self.questions:
+            judge = max(self.questions, key=lambda j: self.questions[j][0].score, default=None)
+        if judge is None or not self.questions.get(judge):
+            self.missed += 1
+            return None
+        self.served += 1
+        return self.questions[judge].pop(0)
+
+    def cancel(self):
+        if self._build is not None and not self._build.done():
+            self._build.cancel()
+            self.cancelled_builds += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "cancelled_builds": self.cancelled_builds,
+            "failed_builds": self.failed_builds,
+            "building": self._build is not None and not self._build.done(),
+            "last_build_s": self.last_build_s,
+            "synthesized": self.synthesized,
+            "questions": {judge: len(qs) for judge, qs in self.questions.items()},
+            "opener_judge": self.opener_judge,
+            "served": self.served,
+            "missed": self.missed,
+        }
@@ -0,0 +1,110 @@
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# -------------------------------------------------
+# Local judge router
+# -------------------------------------------------
+# Picks the judge best suited to answer a user turn without an LLM call.
+# Each judge is a TF-IDF vector built from its description, question focus
+# and prize criteria; a turn is routed to the judge with the highest cosine
+# similarity. When the best score is too low or too close to the runner-up,
+# route() returns None and the caller falls back to the LLM router.
+
+_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers him his how i if in into is it its itself just me more most my no nor not now of off on once
+only or other our ours out over own same she should so some such than that the their them then there these
+they this those through to too under until up very was we were what when where which while who whom why
+will with would you your yours yourself
+""".split())
+
+
+def content_words(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    out = []
+    for w in words:
+        if w in _STOPWORDS or len(w) < 3:
+            continue
+        # Light stemming so "encryption"/"encrypted" and "users"/"user" meet
+        for suffix in ("ations", "ation", "ing", "ies", "ed", "es", "s"):
+            if w.endswith(suffix) and len(w) - len(suffix) >= 4:
+                w = w[:-len(suffix)]
+                break
+        out.append(w)
+    return out
+
+
+def _persona_text(persona: Dict[str, Any]) -> str:
+    parts = [persona["name"], persona.get("description", ""), " ".join(persona.get("question_focus", []))]
+    categories = persona.get("prize_categories") or ([persona["prize_category"]] if "prize_category" in persona else [])
+    for category in categories:
+        parts.append(category.get("details", ""))
+        parts.append(" ".join(category.get("evaluation_criteria", [])))
+    # Focus areas say most about what a judge asks, so they count twice
+    parts.append(" ".join(persona.get("question_focus", [])))
+    return " ".join(parts)
+
+
+class JudgeRouter:
+    """TF-IDF nearest-judge classifier with a confidence cut-off."""
+
+    def __init__(self, personas: List[Dict[str, Any]], min_score: float = 0.05, min_margin: float = 0.02):
+        self.names = [p["name"] for p in personas]
+        self.min_score = min_score
+        self.min_margin = min_margin
+
+        docs = [Counter(content_words(_persona_text(p))) for p in personas]
+        vocab = sorted(set().union(*docs))
+        self._index = {term: i for i, term in enumerate(vocab)}
+        df = np.array([sum(1 for d in docs if term in d) for term in vocab], dtype=np.float64)
+        # Smoothed IDF; terms every judge shares still count a little
+        self._idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+        self._matrix = np.vstack([self._vector(d) for d in docs])
+
+        # Stats
+        self.routed = 0
+        self.fallbacks = 0
+        self._elapsed = 0.0
+
+    def _vector(self, counts: Counter) -> np.ndarray:
+        vec = np.zeros(len(self._index), dtype=np.float64)
+        for term, n in counts.items():
+            i = self._index.get(term)
+            if i is not None:
+                vec[i] = (1.0 + math.log(n)) * self._idf[i]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def scores(self, text: str) -> Dict[str, float]:
+        sims = self._matrix @ self._vector(Counter(content_words(text)))
+        return dict(zip(self.names, sims.tolist()))
+
+    def route(self, text: str) -> Tuple[Optional[str], float]:
+        """(judge, score), or (None, score) when the router isn't confident."""
+        started = time.perf_counter()
+        sims = self._matrix @ self._vector(Counter(content_words(text)))
+        order = np.argsort(sims)[::-1]
+        best = float(sims[order[0]])
+        margin = best - float(sims[order[1]]) if len(order) > 1 else best
+        self._elapsed += time.perf_counter() - started
+        self.routed += 1
+        if best < self.min_score or margin < self.min_margin:
+            self.fallbacks += 1
+            return None, best
+        return self.names[order[0]], best
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "fallback_rate": (self.fallbacks / self.routed) if self.routed else 0.0,
+            "avg_route_us": (self._elapsed / self.routed * 1e6) if self.routed else 0.0,
+            "min_score": self.min_score,
+            "min_margin": self.min_margin,
+        }
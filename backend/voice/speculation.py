@@ -0,0 +1,124 @@
+import asyncio
+import collections
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from voice.router import JudgeRouter
+
+# -------------------------------------------------
+# Speculative judge turns
+# -------------------------------------------------
+# A turn normally runs routing, then the chosen judge's reply, in sequence.
+# A SpeculativeTurn starts routing and the replies of the top-k candidate
+# judges at the same time, usually from the transcript taken at the user's
+# first pause, before the end of their turn. When the turn is confirmed, the
+# winning reply is kept (its sentences so far go to playback at once) and
+# the other candidates are cancelled. If the final transcript differs, the
+# whole speculation is cancelled and the turn starts over.
+
+# Across all sessions: turns, hits, misses, discarded speculations, wasted replies
+speculation_stats = collections.Counter()
+
+# respond(judge, user_input, say) -> (route, target, message)
+Respond = Callable[[str, str, Callable[[str], Any]], Awaitable[Tuple[int, Optional[str], str]]]
+
+
+def same_turn(a: str, b: str) -> bool:
+    """True if two transcripts of a turn say the same words."""
+    words = lambda t: re.findall(r"[a-z0-9']+", t.lower())
+    return words(a) == words(b)
+
+
+class JudgeCandidate:
+    """One judge reply generated ahead of time; its sentences are held until it is chosen."""
+
+    def __init__(self, judge: str, user_input: str, respond: Respond):
+        self.judge = judge
+        self.sentences: List[str] = []
+        self._say: Optional[Callable[[str], Any]] = None
+        self.task = asyncio.create_task(respond(judge, user_input, self._on_sentence))
+
+    def _on_sentence(self, sentence: str):
+        if self._say is not None:
+            self._say(sentence)
+        else:
+            self.sentences.append(sentence)
+
+    def adopt(self, say: Optional[Callable[[str], Any]]):
+        """Send held sentences to say, and every later one as it arrives."""
+        if say is not None:
+            for sentence in self.sentences:
+                say(sentence)
+            self._say = say
+        else:
+            self._say = lambda sentence: None
+        self.sentences = []
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class SpeculativeTurn:
+    """Routing and the top-k candidate replies for one user turn, run in parallel."""
+
+    def __init__(
+        self,
+        user_text: str,
+        router: JudgeRouter,
+        decide: Callable[[str], Awaitable[str]],
+        respond: Respond,
+        k: int = 2,
+    ):
+        """decide is only asked (alongside the candidates) when the router isn't confident."""
+        self.user_text = user_text
+        self.respond = respond
+        judge, _ = router.route(user_text)
+        if judge is not None:
+            # The local router is sure, so only one reply is needed
+            self.decision: asyncio.Future = asyncio.get_running_loop().create_future()
+            self.decision.set_result(judge)
+            names = [judge]
+        else:
+            self.decision = asyncio.create_task(decide(user_text))
+            scores = router.scores(user_text)
+            names = sorted(scores, key=scores.get, reverse=True)[:max(1, k)]
+        self.candidates: Dict[str, JudgeCandidate] = {
+            name: JudgeCandidate(name, user_text, respond) for name in names
+        }
+        self.hit: Optional[bool] = None
+        self.wasted = 0     # candidate replies started and then cancelled
+        self._settled = False
+
+    async def resolve(self, say_for: Callable[[str], Optional[Callable[[str], Any]]]) -> Tuple[str, int, Optional[str], str]:
+        """Wait for routing, keep the winner, cancel the rest; returns (judge, route, target, message)."""
+        judge = await self.decision
+        self._settled = True
+        for name, candidate in self.candidates.items():
+            if name != judge:
+                candidate.cancel()
+                self._waste()
+        candidate = self.candidates.get(judge)
+        self.hit = candidate is not None
+        speculation_stats["turns"] += 1
+        speculation_stats["hits" if self.hit else "misses"] += 1
+        if candidate is None:
+            candidate = JudgeCandidate(judge, self.user_text, self.respond)
+        candidate.adopt(say_for(judge))
+        route, target, message = await candidate.task
+        return judge, route, target, message
+
+    def _waste(self):
+        self.wasted += 1
+        speculation_stats["wasted_replies"] += 1
+
+    def cancel(self):
+        """Drop the whole speculation (a resolved turn's winner is cancelled too)."""
+        if not self._settled:
+            self._settled = True
+            speculation_stats["discarded"] += 1
+        if isinstance(self.decision, asyncio.Task):
+            self.decision.cancel()
+        for candidate in self.candidates.values():
+            if not candidate.task.done():
+                self._waste()
+            candidate.cancel()
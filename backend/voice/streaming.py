@@ -0,0 +1,111 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from voice.audio_buffer import AudioBuffer
+from voice.capture import CaptureService
+
+# -------------------------------------------------
+# Streaming pitch transcription
+# -------------------------------------------------
+# Taps the session's microphone until stop() and re-transcribes only the uncommitted
+# tail of the recording every step_seconds. Whisper segments that end more
+# than hold_back_seconds before the end of the audio are committed and never
+# transcribed again, and dropped from the buffer, so when the pitch ends
+# only the last few seconds are left to decode and memory holds only the
+# uncommitted tail, however long the pitch runs.
+
+Segment = Tuple[float, float, str]
+# transcribe_segments(audio, final) -> segments; final is True for the last pass
+SegmentTranscriber = Callable[[np.ndarray, bool], Awaitable[List[Segment]]]
+
+
+class StreamingTranscriber:
+    """
+    Rolling-window transcription of a CaptureService's audio. on_partial is
+    awaited with the full text so far (committed + current hypothesis) after
+    every step; run() returns the final transcript once stop() is called.
+    """
+
+    def __init__(
+        self,
+        source: CaptureService,
+        transcribe_segments: SegmentTranscriber,
+        on_partial: Optional[Callable[[str], Awaitable]] = None,
+        step_seconds: float = 1.0,
+        hold_back_seconds: float = 2.0,
+        max_window_seconds: float = 20.0,
+    ):
+        self.source = source
+        self.transcribe_segments = transcribe_segments
+        self.on_partial = on_partial
+        self.rate = source.rate
+        self.step_seconds = step_seconds
+        self.hold_back_seconds = hold_back_seconds
+        self.max_window_seconds = max_window_seconds
+
+        self._buffer = AudioBuffer(self.rate, seconds=max_window_seconds + 2 * step_seconds)
+        self._committed = 0       # samples covered by committed text, not yet discarded
+        self._committed_text: List[str] = []
+        self._last_transcribed = 0
+        self._stop_requested = False
+        self._stopped: Optional[asyncio.Event] = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(self._committed_text).strip()
+
+    def stop(self):
+        self._stop_requested = True
+        if self._stopped is not None:
+            self._stopped.set()
+
+    async def _transcribe_tail(self, final: bool) -> str:
+        end = len(self._buffer)
+        start = self._committed
+        if end - start < int(self.rate * 0.3) or (not final and end == self._last_transcribed):
+            return self.text
+        self._last_transcribed = end
+        audio = self._buffer.view(start, end)
+        segments = await self.transcribe_segments(audio, final)
+
+        window = (end - start) / self.rate
+        if final:
+            cutoff = window
+        else:
+            cutoff = window - self.hold_back_seconds
+            if window > self.max_window_seconds and len(segments) > 1:
+                cutoff = max(cutoff, segments[-2][1])
+        committed = [seg for seg in segments if seg[1] <= cutoff]
+        pending = segments[len(committed):]
+
+        if committed:
+            self._committed_text.extend(seg[2] for seg in committed if seg[2])
+            self._committed = start + int(committed[-1][1] * self.rate)
+            # Committed audio is never decoded again
+            self._buffer.discard(self._committed)
+            self._last_transcribed -= self._committed
+            self._committed = 0
+        return " ".join([self.text] + [seg[2] for seg in pending if seg[2]]).strip()
+
+    async def run(self) -> str:
+        self._stopped = asyncio.Event()
+        if self._stop_requested:
+            self._stopped.set()
+        # Blocks arrive on the capture thread and are copied in right away
+        listener = self._buffer.write
+        self.source.add_listener(listener)
+        try:
+            while not self._stopped.is_set():
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), self.step_seconds)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                partial = await self._transcribe_tail(final=False)
+                if partial and self.on_partial:
+                    await self.on_partial(partial)
+        finally:
+            self.source.remove_listener(listener)
+        return await self._transcribe_tail(final=True)
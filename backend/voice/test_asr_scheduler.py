@@ -0,0 +1,108 @@
+import asyncio
+import threading
+
+import pytest
+
+from voice.asr_scheduler import BULK, INTERACTIVE, STREAMING, TranscriptionScheduler
+
+
+class Recorder:
+    """Stand-in for the Whisper pool: records calls, can block until released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def one(self, item):
+        self.release.wait(5)
+        self.calls.append(item)
+        return f"text {item}"
+
+    def many(self, items):
+        self.release.wait(5)
+        self.calls.append(tuple(items))
+        return [f"text {item}" for item in items]
+
+
+async def wait_until(predicate):
+    for _ in range(500):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+def test_interactive_lane_goes_first():
+    async def run():
+        pool = Recorder()
+        scheduler = TranscriptionScheduler(workers=1)
+        pool.release.clear()
+        # Keeps the general worker busy while the rest queue up
+        blocker = asyncio.create_task(scheduler.submit(pool.one, "blocker", lane=BULK))
+        await wait_until(lambda: scheduler.stats()["lanes"][BULK]["running"])
+        jobs = [
+            asyncio.create_task(scheduler.submit(pool.one, "bulk", lane=BULK)),
+            asyncio.create_task(scheduler.submit(pool.one, "streaming", lane=STREAMING)),
+        ]
+        await wait_until(lambda: scheduler.depth == 2)
+        # The reserved interactive worker takes this at once
+        pool.release.set()
+        result = await scheduler.submit(pool.one, "turn", lane=INTERACTIVE)
+        await asyncio.gather(blocker, *jobs)
+        await scheduler.close()
+        return result, pool.calls
+
+    result, calls = asyncio.run(run())
+    assert result == "text turn"
+    assert calls.index("streaming") < calls.index("bulk")
+
+
+def test_cancel_drops_queued_jobs_of_owner_only():
+    async def run():
+        pool = Recorder()
+        scheduler = TranscriptionScheduler(workers=1)
+        pool.release.clear()
+        blocker = asyncio.create_task(scheduler.submit(pool.one, "blocker", lane=BULK, owner="b"))
+        await wait_until(lambda: scheduler.stats()["lanes"][BULK]["running"])
+        mine = asyncio.create_task(scheduler.submit(pool.one, "mine", lane=BULK, owner="a"))
+        theirs = asyncio.create_task(scheduler.submit(pool.one, "theirs", lane=BULK, owner="b"))
+        await wait_until(lambda: scheduler.depth == 2)
+
+        assert scheduler.cancel("a") == 1
+        pool.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await mine
+        results = await asyncio.gather(blocker, theirs)
+        await scheduler.close()
+        return results, pool.calls, scheduler.stats()
+
+    results, calls, stats = asyncio.run(run())
+    assert results == ["text blocker", "text theirs"]
+    assert "mine" not in calls
+    assert stats["lanes"][BULK]["cancelled"] == 1
+
+
+def test_queued_batchable_jobs_are_merged():
+    async def run():
+        pool = Recorder()
+        scheduler = TranscriptionScheduler(workers=1, max_batch=3)
+        pool.release.clear()
+        blocker = asyncio.create_task(scheduler.submit(pool.one, "blocker", lane=BULK))
+        await wait_until(lambda: scheduler.stats()["lanes"][BULK]["running"])
+        jobs = [
+            asyncio.create_task(scheduler.submit(pool.one, i, lane=STREAMING, batch=pool.many))
+            for i in range(4)
+        ]
+        await wait_until(lambda: scheduler.depth == 4)
+        pool.release.set()
+        results = await asyncio.gather(*jobs)
+        await blocker
+        await scheduler.close()
+        return results, pool.calls, scheduler.stats()
+
+    results, calls, stats = asyncio.run(run())
+    assert results == ["text 0", "text 1", "text 2", "text 3"]
+    assert calls == ["blocker", (0, 1, 2), 3]
+    assert stats["lanes"][STREAMING]["batches"] == 1
+    assert stats["lanes"][STREAMING]["batched_jobs"] == 3
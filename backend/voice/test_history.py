@@ -0,0 +1,55 @@
+import asyncio
+
+from voice.history import PromptHistory
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_lines_append_and_pitch_stays_pinned():
+    history = PromptHistory(summarize=None, count_tokens=count_words, budget_tokens=100)
+    history.add("User (Pitch)", "We sell shovels")
+    history.add("Google Judge", "Why shovels?")
+
+    assert history.render() == "User (Pitch): We sell shovels\nGoogle Judge: Why shovels?\n"
+    assert history.tokens == 4
+
+
+def test_old_turns_fold_into_summary_once_over_budget():
+    async def summarize(summary, lines):
+        return f"{len(lines)} earlier lines"
+
+    async def run():
+        history = PromptHistory(summarize, count_words, budget_tokens=8)
+        history.add("User (Pitch)", "A very long pitch that is never summarized")
+        for i in range(4):
+            history.add("User", f"answer number {i}")
+        await history._compacting
+        return history
+
+    history = asyncio.run(run())
+    text = history.render()
+    assert text.startswith("User (Pitch): A very long pitch that is never summarized\n")
+    # Folded down to half the budget when the third answer went over it
+    assert "(Summary of earlier Q&A: 2 earlier lines)\nUser: answer number 2\n" in text
+    assert text.endswith("User: answer number 3\n")
+    assert history.stats()["recent_lines"] == 2
+    assert history.stats()["compactions"] == 1
+
+
+def test_failed_summary_keeps_lines():
+    async def summarize(summary, lines):
+        raise RuntimeError("no network")
+
+    async def run():
+        history = PromptHistory(summarize, count_words, budget_tokens=4)
+        history.add("User (Pitch)", "pitch")
+        for i in range(3):
+            history.add("User", f"answer {i}")
+        await history._compacting
+        return history
+
+    history = asyncio.run(run())
+    assert history.render().count("User: answer") == 3
+    assert history.stats()["failed_compactions"] == 1
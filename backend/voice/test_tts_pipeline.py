@@ -0,0 +1,96 @@
+import asyncio
+
+from voice.tts_pipeline import JudgeOutputParser, PlaybackScheduler, SentenceSplitter
+
+
+def feed_all(parser, tokens):
+    sentences = []
+    for token in tokens:
+        sentences.extend(parser.feed(token))
+    return sentences + parser.close()
+
+
+def test_splitter_joins_short_sentences():
+    splitter = SentenceSplitter(min_chars=20)
+    assert splitter.feed("Hi. That is a fine idea. ") == ["Hi. That is a fine idea."]
+    assert splitter.feed("Who are your buyers? And") == ["Who are your buyers?"]
+    assert splitter.feed(" the margins?") == []
+    assert splitter.flush() == ["And the margins?"]
+    assert splitter.flush() == []
+
+
+def test_parser_reads_header_and_streams_message():
+    parser = JudgeOutputParser()
+    tokens = ["Route", ": 1\nTar", "get: Google Judge\nMess", "age: How do you ", "scale this? Who pays ", "for it?"]
+    sentences = feed_all(parser, tokens)
+
+    assert parser.route == 1
+    assert parser.target == "Google Judge"
+    assert sentences == ["How do you scale this?", "Who pays for it?"]
+    assert parser.message == "How do you scale this? Who pays for it?"
+
+
+def test_parser_defaults_and_stops_at_end_of_message_line():
+    parser = JudgeOutputParser()
+    sentences = feed_all(parser, ["Route: x\n", "Message: ```Tell me about churn please.\n", "SpeakWithEachOther: false"])
+
+    assert parser.route == 0
+    assert parser.target is None
+    assert sentences == ["Tell me about churn please."]
+
+
+def make_scheduler(played, result=True):
+    async def synthesize(text, voice_id, previous):
+        await asyncio.sleep(0)
+        return text.encode()
+
+    async def play(audio):
+        await asyncio.sleep(0)
+        played.append(audio.decode())
+        return result
+
+    return PlaybackScheduler(synthesize, play)
+
+
+def test_playback_in_order_with_dedup():
+    async def run():
+        played = []
+        scheduler = make_scheduler(played)
+        assert scheduler.say("v", "First sentence.")
+        assert scheduler.say("v", "Second sentence.")
+        assert not scheduler.say("v", "first   SENTENCE!")
+        await scheduler.drain()
+        scheduler.close()
+        return played, scheduler.stats()
+
+    played, stats = asyncio.run(run())
+    assert played == ["First sentence.", "Second sentence."]
+    assert stats["played"] == 2
+    assert stats["deduplicated"] == 1
+
+
+def test_interrupted_playback_is_not_counted_as_played():
+    async def run():
+        scheduler = make_scheduler([], result=False)
+        scheduler.say("v", "Cut off sentence.")
+        await scheduler.drain()
+        scheduler.close()
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert stats["played"] == 0
+    assert stats["interrupted"] == 1
+
+
+def test_close_ends_play_loop():
+    async def run():
+        scheduler = make_scheduler([])
+        scheduler.say("v", "Never finishes synthesis.")
+        await asyncio.sleep(0)
+        scheduler.close()
+        await asyncio.sleep(0.01)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler._task.done()
+    assert not scheduler.say("v", "After close.")
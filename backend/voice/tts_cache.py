@@ -0,0 +1,108 @@
+import collections
+import hashlib
+import os
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+# -------------------------------------------------
+# TTS audio cache
+# -------------------------------------------------
+# Synthesized speech on disk, one raw PCM file per (voice, model, format,
+# text), named by the hash of that key. Text is normalized (Unicode NFKC,
+# whitespace collapsed) so trivially different strings share an entry. The
+# directory is kept under max_bytes by evicting the least recently used
+# files; recency survives restarts through file mtimes.
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class TTSCache:
+    """Size-bounded, least-recently-used disk cache of synthesized audio."""
+
+    def __init__(self, directory: str = "tts_cache", max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "collections.OrderedDict[str, int]" = collections.OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pcm"):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pcm")
+
+    @staticmethod
+    def key(voice_id: str, model_id: str, output_format: str, text: str) -> str:
+        raw = "\0".join((voice_id, model_id, output_format, normalize_text(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, voice_id: str, model_id: str, output_format: str, text: str) -> Optional[bytes]:
+        key = self.key(voice_id, model_id, output_format, text)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, voice_id: str, model_id: str, output_format: str, text: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        key = self.key(voice_id, model_id, output_format, text)
+        path = self._path(key)
+        # Write then rename, so a reader never sees a partial file
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += len(audio) - self._entries.pop(key, 0)
+            self._entries[key] = len(audio)
+            while self._bytes > self.max_bytes and self._entries:
+                old_key, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,276 @@
+import asyncio
+import collections
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# -------------------------------------------------
+# Sentence-pipelined judge speech
+# -------------------------------------------------
+# Judge replies stream from the LLM token by token. JudgeOutputParser pulls
+# the Route/Target header out of the stream and cuts the Message text into
+# sentences as soon as each one is complete. Each sentence goes straight to
+# the session's PlaybackScheduler, which synthesizes a sentence or two ahead
+# of playback, so the first sentence is playing while the rest of the reply
+# is still being generated.
+
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+")
+
+
+class SentenceSplitter:
+    """Incremental sentence segmentation; very short sentences are joined to the next."""
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            if match.end() - start >= self.min_chars:
+                sentences.append(self._buffer[start:match.end()].strip())
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class JudgeOutputParser:
+    """
+    Streaming parser for the judges' output format:
+        Route: X
+        Target: (only if X=1)
+        Message: ...
+    feed() returns the Message sentences completed by each token.
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.route = 0
+        self.target: Optional[str] = None
+        self.message = ""
+        self._header = ""
+        self._in_message = False
+        self._done = False
+        self._splitter = SentenceSplitter(min_chars)
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        return (
+            text
+            .replace('```', '')
+            .replace('SpeakWithEachOther: false', '')
+            .replace('SpeakWithEachOther: true', '')
+        )
+
+    def _parse_header_line(self, line: str):
+        line = line.strip()
+        if line.startswith("Route:"):
+            try:
+                self.route = int(line.split(":", 1)[1].strip())
+            except ValueError:
+                self.route = 0
+        elif line.startswith("Target:"):
+            self.target = line.split(":", 1)[1].strip() or None
+
+    def _message_text(self, text: str) -> List[str]:
+        # The message is the rest of the "Message:" line
+        if "\n" in text:
+            text = text.split("\n", 1)[0]
+            self._done = True
+        text = self._clean(text)
+        if not self.message:
+            text = text.lstrip()
+        self.message += text
+        return self._splitter.feed(text)
+
+    def feed(self, token: str) -> List[str]:
+        if self._done:
+            return []
+        if self._in_message:
+            return self._message_text(token)
+
+        self._header += token
+        marker = self._header.find("Message:")
+        if marker == -1:
+            # Parse header lines as they complete
+            *lines, self._header = self._header.split("\n")
+            for line in lines:
+                self._parse_header_line(line)
+            return []
+        for line in self._header[:marker].split("\n"):
+            self._parse_header_line(line)
+        self._in_message = True
+        rest, self._header = self._header[marker + len("Message:"):], ""
+        return self._message_text(rest)
+
+    def close(self) -> List[str]:
+        self.message = self.message.strip()
+        return self._splitter.flush()
+
+
+@dataclass
+class Utterance:
+    voice_id: str
+    text: str
+    previous: str
+    key: Tuple[str, str]
+    audio: Optional[asyncio.Task] = None
+
+
+def _dedup_key(voice_id: str, text: str) -> Tuple[str, str]:
+    return voice_id, " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class PlaybackScheduler:
+    """
+    The one queue a session's speech goes through. Utterances play strictly
+    in order; synthesis runs up to `lookahead` utterances ahead of playback.
+    An utterance identical to one queued, playing or played within
+    dedup_seconds (same voice, same words) is dropped instead of being
+    synthesized again. flush() empties the queue and stops playback at once.
+    """
+
+    def __init__(
+        self,
+        synthesize: Callable[[str, str, str], Awaitable[bytes]],
+        play: Callable[[bytes], Awaitable],
+        stop_audio: Callable[[], None] = lambda: None,
+        lookahead: int = 2,
+        dedup_seconds: float = 10.0,
+    ):
+        self.synthesize = synthesize
+        self.play = play
+        self.stop_audio = stop_audio
+        self.lookahead = max(1, lookahead)
+        self.dedup_seconds = dedup_seconds
+
+        self._queue: Deque[Utterance] = collections.deque()
+        self._current: Optional[Utterance] = None
+        self._recent: Dict[Tuple[str, str], float] = {}
+        self._last_text: Dict[str, str] = {}
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self._generation = 0
+        self._closed = False
+
+        # Stats
+        self.requested = 0
+        self.deduplicated = 0
+        self.synthesized = 0
+        self.played = 0
+        self.interrupted = 0
+        self.flushed = 0
+
+    def _is_duplicate(self, key: Tuple[str, str]) -> bool:
+        if self._current is not None and self._current.key == key:
+            return True
+        if any(u.key == key for u in self._queue):
+            return True
+        played_at = self._recent.get(key)
+        return played_at is not None and time.monotonic() - played_at < self.dedup_seconds
+
+    def say(self, voice_id: str, text: str) -> bool:
+        """Queue text in voice_id; returns False if it was a duplicate."""
+        text = text.strip()
+        if not text or self._closed:
+            return False
+        self.requested += 1
+        key = _dedup_key(voice_id, text)
+        if self._is_duplicate(key):
+            self.deduplicated += 1
+            return False
+        self._queue.append(Utterance(voice_id, text, self._last_text.get(voice_id, ""), key))
+        self._last_text[voice_id] = text
+        self._prefetch()
+        self._idle.clear()
+        self._wake.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._play_loop())
+        return True
+
+    async def _synthesize(self, utterance: Utterance) -> bytes:
+        audio = await self.synthesize(utterance.text, utterance.voice_id, utterance.previous)
+        self.synthesized += 1
+        return audio
+
+    def _prefetch(self):
+        for utterance in list(self._queue)[:self.lookahead]:
+            if utterance.audio is None:
+                utterance.audio = asyncio.create_task(self._synthesize(utterance))
+
+    async def _play_loop(self):
+        while True:
+            if not self._queue:
+                self._idle.set()
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            generation = self._generation
+            utterance = self._current = self._queue.popleft()
+            self._prefetch()
+            if utterance.audio is None:
+                utterance.audio = asyncio.create_task(self._synthesize(utterance))
+            try:
+                audio = await utterance.audio
+                if generation == self._generation:
+                    # play() returns False when the audio was cut off
+                    if await self.play(audio) is False:
+                        self.interrupted += 1
+                    else:
+                        self.played += 1
+                        self._recent[utterance.key] = time.monotonic()
+            except asyncio.CancelledError:
+                # A flush only cancels the current utterance; close() ends the loop
+                if self._closed or generation == self._generation:
+                    raise
+            except Exception as e:
+                print(f"\nTTS Error: {e}")
+            finally:
+                self._current = None
+            # Forget old entries so the dedup map stays small
+            cutoff = time.monotonic() - self.dedup_seconds
+            self._recent = {k: t for k, t in self._recent.items() if t >= cutoff}
+
+    async def drain(self):
+        """Wait until everything queued has played."""
+        await self._idle.wait()
+
+    def flush(self):
+        """Drop everything queued and stop what is playing."""
+        self._generation += 1
+        self.flushed += len(self._queue) + (self._current is not None)
+        for utterance in self._queue:
+            if utterance.audio is not None:
+                utterance.audio.cancel()
+        self._queue.clear()
+        if self._current is not None and self._current.audio is not None:
+            self._current.audio.cancel()
+        self._last_text.clear()
+        self.stop_audio()
+
+    def close(self):
+        self._closed = True
+        self.flush()
+        if self._task is not None:
+            self._task.cancel()
+        self._idle.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self._queue),
+            "playing": self._current is not None,
+            "requested": self.requested,
+            "deduplicated": self.deduplicated,
+            "synthesized": self.synthesized,
+            "played": self.played,
+            "interrupted": self.interrupted,
+            "flushed": self.flushed,
+        }
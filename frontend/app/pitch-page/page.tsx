@@ -13,7 +13,7 @@ export default function PitchPage() {
   const [isAnalyzing, setIsAnalyzing] = useState<boolean>(false);
 
   const [isSessionActive, setIsSessionActive] = useState(false);
-  const [transcript, setTranscript] = useState<Array<{ speaker: string; text: string }>>([]);
+  const [transcript, setTranscript] = useState<Array<{ speaker: string; text: string; partial?: boolean }>>([]);
 
   const videoRef = useRef<HTMLImageElement>(null);
   const [videoAvailable, setVideoAvailable] = useState(false); 
@@ -74,7 +74,15 @@ export default function PitchPage() {
     wsTx.onmessage = (evt) => {
       try {
         const msg = JSON.parse(evt.data);
-        setTranscript(prev => [...prev, { speaker: msg.speaker, text: msg.text }]);
+        const entry = { speaker: msg.speaker, text: msg.text, partial: !!msg.partial };
+        setTranscript(prev => {
+          // A live partial is replaced by the next message from the same speaker
+          const last = prev[prev.length - 1];
+          if (last && last.partial && last.speaker === entry.speaker) {
+            return [...prev.slice(0, -1), entry];
+          }
+          return [...prev, entry];
+        });
         if (msg.speaker in speakerToImageMap) {
           setCurrentSpeaker(msg.speaker);
         } else if (msg.speaker === "User" || msg.speaker === "User (Pitch)") {